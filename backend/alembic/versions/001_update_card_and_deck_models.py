@@ -0,0 +1,61 @@
+"""update card and deck models
+
+Revision ID: 001
+Revises: 
+Create Date: 2026-10-15 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '001'
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Bundle every change to `cards` into one ALTER TABLE so PostgreSQL
+    # rewrites the heap once instead of once per column.
+    clauses = [
+        "ALTER COLUMN legalities TYPE JSONB USING legalities::jsonb",
+        "ALTER COLUMN vector_embedding TYPE JSONB USING vector_embedding::jsonb",
+        "ADD COLUMN IF NOT EXISTS layout VARCHAR",
+        "ADD COLUMN IF NOT EXISTS card_faces JSONB",
+        "ADD COLUMN IF NOT EXISTS back_image_uri VARCHAR",
+    ]
+    op.execute("ALTER TABLE cards " + ", ".join(clauses))
+
+    # Backfill NULL deck collections in a single pass over `decks`
+    op.execute("SET LOCAL synchronous_commit = off")
+    op.execute("""
+        UPDATE decks
+        SET mainboard = COALESCE(mainboard, '{}'::jsonb),
+            sideboard = COALESCE(sideboard, '{}'::jsonb),
+            colors = COALESCE(colors, '[]'::jsonb),
+            strategy_tags = COALESCE(strategy_tags, '[]'::jsonb)
+        WHERE mainboard IS NULL
+           OR sideboard IS NULL
+           OR colors IS NULL
+           OR strategy_tags IS NULL
+    """)
+
+    # Refresh planner statistics and clear the dead tuples left by the
+    # rewrites above; VACUUM cannot run inside the migration transaction.
+    with op.get_context().autocommit_block():
+        op.execute("VACUUM (ANALYZE) cards")
+        op.execute("VACUUM (ANALYZE) decks")
+
+
+def downgrade() -> None:
+    clauses = [
+        "DROP COLUMN IF EXISTS back_image_uri",
+        "DROP COLUMN IF EXISTS card_faces",
+        "DROP COLUMN IF EXISTS layout",
+        "ALTER COLUMN vector_embedding TYPE JSON USING vector_embedding::json",
+        "ALTER COLUMN legalities TYPE JSON USING legalities::json",
+    ]
+    op.execute("ALTER TABLE cards " + ", ".join(clauses))
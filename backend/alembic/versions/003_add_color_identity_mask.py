@@ -0,0 +1,41 @@
+"""add color identity mask
+
+Revision ID: 003
+Revises: 002
+Create Date: 2026-10-15 11:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '003'
+down_revision: Union[str, None] = '002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute("ALTER TABLE cards ADD COLUMN IF NOT EXISTS color_identity_mask SMALLINT")
+    op.execute("""
+        UPDATE cards
+        SET color_identity_mask =
+            (CASE WHEN 'W' = ANY(color_identity) THEN 1 ELSE 0 END)
+          | (CASE WHEN 'U' = ANY(color_identity) THEN 2 ELSE 0 END)
+          | (CASE WHEN 'B' = ANY(color_identity) THEN 4 ELSE 0 END)
+          | (CASE WHEN 'R' = ANY(color_identity) THEN 8 ELSE 0 END)
+          | (CASE WHEN 'G' = ANY(color_identity) THEN 16 ELSE 0 END)
+    """)
+
+    with op.get_context().autocommit_block():
+        op.execute("CREATE INDEX CONCURRENTLY IF NOT EXISTS cards_cim_idx ON cards (color_identity_mask)")
+        op.execute("VACUUM (ANALYZE) cards")
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS cards_cim_idx")
+
+    op.execute("ALTER TABLE cards DROP COLUMN IF EXISTS color_identity_mask")
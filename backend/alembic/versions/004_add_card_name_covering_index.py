@@ -0,0 +1,38 @@
+"""add card name covering index
+
+Revision ID: 004
+Revises: 003
+Create Date: 2026-10-15 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '004'
+down_revision: Union[str, None] = '003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Carry the columns read by card detail lookups in the index so
+    # `name = ANY(:names)` can be answered with an index-only scan.
+    with op.get_context().autocommit_block():
+        op.execute("SET maintenance_work_mem = '1GB'")
+        op.execute("SET max_parallel_maintenance_workers = 4")
+        op.execute("""
+            CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_cards_name_covering
+            ON cards (name) INCLUDE (mana_cost, type_line, cmc, color_identity, oracle_text)
+        """)
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_cards_name")
+        # Index-only scans need an up-to-date visibility map
+        op.execute("VACUUM (ANALYZE) cards")
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.execute("CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_cards_name ON cards (name)")
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_cards_name_covering")
@@ -0,0 +1,42 @@
+"""add card format bucket
+
+Revision ID: 005
+Revises: 004
+Create Date: 2026-10-15 13:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '005'
+down_revision: Union[str, None] = '004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Bucket each card by the narrowest format it is legal in so format
+    # searches can skip the rest of the corpus.
+    op.execute("""
+        ALTER TABLE cards ADD COLUMN IF NOT EXISTS format_bucket VARCHAR GENERATED ALWAYS AS (
+            CASE
+                WHEN legalities->>'standard' = 'legal' THEN 'standard'
+                WHEN legalities->>'modern' = 'legal' THEN 'modern'
+                ELSE 'other'
+            END
+        ) STORED
+    """)
+
+    with op.get_context().autocommit_block():
+        op.execute("CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_cards_format_bucket ON cards (format_bucket)")
+        op.execute("VACUUM (ANALYZE) cards")
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS idx_cards_format_bucket")
+
+    op.execute("ALTER TABLE cards DROP COLUMN IF EXISTS format_bucket")
@@ -0,0 +1,34 @@
+"""add card legalities gin index
+
+Revision ID: 006
+Revises: 005
+Create Date: 2026-10-15 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '006'
+down_revision: Union[str, None] = '005'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # jsonb_path_ops only supports containment, which is all format searches
+    # use (legalities @> {"<format>": "legal"}), and is much smaller than the
+    # default jsonb_ops opclass.
+    with op.get_context().autocommit_block():
+        op.execute("""
+            CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_cards_legalities_gin
+            ON cards USING gin (legalities jsonb_path_ops)
+        """)
+        op.execute("VACUUM (ANALYZE) cards")
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS idx_cards_legalities_gin")
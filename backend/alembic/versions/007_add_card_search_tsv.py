@@ -0,0 +1,44 @@
+"""add card search tsvector
+
+Revision ID: 007
+Revises: 006
+Create Date: 2026-10-15 15:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '007'
+down_revision: Union[str, None] = '006'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Tokenize name + oracle text once at write time instead of per row on
+    # every full-text search (generated columns require PostgreSQL 12+).
+    op.execute("""
+        ALTER TABLE cards ADD COLUMN IF NOT EXISTS search_tsv tsvector GENERATED ALWAYS AS (
+            to_tsvector('english', coalesce(name, '') || ' ' || coalesce(oracle_text, ''))
+        ) STORED
+    """)
+
+    with op.get_context().autocommit_block():
+        op.execute("CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_cards_search_tsv ON cards USING gin (search_tsv)")
+        # The expression index never matched the query's expression; search_tsv supersedes it
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS idx_cards_text_search")
+        op.execute("VACUUM (ANALYZE) cards")
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS idx_cards_search_tsv")
+        op.execute("""
+            CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_cards_text_search
+            ON cards USING gin (to_tsvector('english', name || ' ' || COALESCE(oracle_text, '')))
+        """)
+
+    op.execute("ALTER TABLE cards DROP COLUMN IF EXISTS search_tsv")
@@ -0,0 +1,53 @@
+"""make card collection columns NOT NULL with empty defaults
+
+Revision ID: 010
+Revises: 009
+Create Date: 2026-10-15 18:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '010'
+down_revision: Union[str, None] = '009'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # populate no longer coerces malformed collections per row; backfill the
+    # NULLs once so the constraints below can hold.
+    op.execute("""
+        UPDATE cards
+        SET color_identity = COALESCE(color_identity, '{}'),
+            keywords = COALESCE(keywords, '{}'),
+            legalities = COALESCE(legalities, '{}'::jsonb)
+        WHERE color_identity IS NULL
+           OR keywords IS NULL
+           OR legalities IS NULL
+    """)
+
+    clauses = [
+        "ALTER COLUMN color_identity SET DEFAULT '{}'",
+        "ALTER COLUMN color_identity SET NOT NULL",
+        "ALTER COLUMN keywords SET DEFAULT '{}'",
+        "ALTER COLUMN keywords SET NOT NULL",
+        "ALTER COLUMN legalities SET DEFAULT '{}'::jsonb",
+        "ALTER COLUMN legalities SET NOT NULL",
+    ]
+    op.execute("ALTER TABLE cards " + ", ".join(clauses))
+
+
+def downgrade() -> None:
+    clauses = [
+        "ALTER COLUMN legalities DROP NOT NULL",
+        "ALTER COLUMN legalities DROP DEFAULT",
+        "ALTER COLUMN keywords DROP NOT NULL",
+        "ALTER COLUMN keywords DROP DEFAULT",
+        "ALTER COLUMN color_identity DROP NOT NULL",
+        "ALTER COLUMN color_identity DROP DEFAULT",
+    ]
+    op.execute("ALTER TABLE cards " + ", ".join(clauses))
@@ -0,0 +1,37 @@
+"""add deck archetype, deck_list and performance_data columns
+
+Revision ID: 011
+Revises: 010
+Create Date: 2026-10-15 19:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '011'
+down_revision: Union[str, None] = '010'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Columns written by the reviewer's deck saves and read by the similar-decks
+    # lookup; nullable, so adding them is a catalog-only change.
+    clauses = [
+        "ADD COLUMN IF NOT EXISTS archetype VARCHAR",
+        "ADD COLUMN IF NOT EXISTS deck_list JSONB",
+        "ADD COLUMN IF NOT EXISTS performance_data JSONB",
+    ]
+    op.execute("ALTER TABLE decks " + ", ".join(clauses))
+
+
+def downgrade() -> None:
+    clauses = [
+        "DROP COLUMN IF EXISTS performance_data",
+        "DROP COLUMN IF EXISTS deck_list",
+        "DROP COLUMN IF EXISTS archetype",
+    ]
+    op.execute("ALTER TABLE decks " + ", ".join(clauses))
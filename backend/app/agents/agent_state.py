@@ -1,14 +1,25 @@
-from typing import Any, List, Optional
-from pydantic import BaseModel
+from typing import Any, Dict, List, Optional
+from pydantic import BaseModel, ConfigDict, Field
 from langchain_core.messages import BaseMessage
-from backend.app.models.card import Deck
-from backend.app.models.schemas import DeckRequirements
+from app.models.card import Deck
+from app.models.schemas import DeckRequirements
+from app.utils.json_codec import dumps
 
 class AgentState(BaseModel):
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
     requirements: DeckRequirements
     deck: Optional[Deck] = None
     messages: List[BaseMessage]
     current_agent: str
-    db: Any  # Database connection (not serialized)
     iteration: int = 0
-    max_iterations: int = 5
\ No newline at end of file
+    max_iterations: int = 5
+    parsed_outputs: Dict[str, Any] = Field(default_factory=dict)  # Parsed JSON output of each agent
+
+    def dump(self, field: str) -> Dict[str, Any]:
+        """Returns `model_dump(mode="json")` of the given field."""
+        return getattr(self, field).model_dump(mode="json")
+
+    def dump_json(self, field: str) -> str:
+        """Returns the JSON text of `dump(field)`."""
+        return dumps(self.dump(field))
@@ -1,120 +1,149 @@
-import json
-from typing import Any, Dict
+import inspect
+import logging
+from contextlib import aclosing
+from typing import Any, Dict, Optional
 from langchain_groq import ChatGroq
-from langchain_core.messages import AIMessage
-from langchain_core.prompts import ChatPromptTemplate,MessagesPlaceholder
-from backend.app.agents.agent_state import AgentState
-from backend.app.core.database import CardDatabase
-from backend.app.models.card import Card, Deck
-from backend.app.models.schemas import CardRole, ManaCost
-from backend.app.utils.utils import calculate_deck_statistics
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+from app.agents.agent_state import AgentState
+from app.core.database import CardDatabase
+from app.models.card import Card, Deck
+from app.models.schemas import CardRole, DeckList, ManaCost, StrategyResult
+from app.utils.json_codec import dumps
+from app.utils.utils import calculate_deck_statistics_from_lists
+
+logger = logging.getLogger(__name__)
+
+
+_CARD_SELECTOR_SYSTEM_PROMPT = inspect.cleandoc("""You are an expert Magic: The Gathering card selector.
+    Based on the strategy and requirements, select specific cards for the deck.
+    
+    Consider:
+    1. Card synergies and interactions
+    2. Mana curve optimization
+    3. Color requirements and mana base needs
+    4. Format legality and restrictions
+    5. Budget constraints if specified
+    
+    For each card selection, provide:
+    - Quantity
+    - Role in the deck
+    - Synergy explanations
+    - Alternative options
+    
+    Output your selections in a structured format:
+    ```json
+    {
+        "main_deck": {
+            "creatures": [{"name": string, "quantity": int, "role": string}],
+            "spells": [{"name": string, "quantity": int, "role": string}],
+            "other": [{"name": string, "quantity": int, "role": string}]
+        },
+        "lands": [{"name": string, "quantity": int, "role": string}],
+        "sideboard": [{"name": string, "quantity": int, "role": string}]
+    }
+    ```""")
+_CARD_SELECTOR_SYSTEM_MESSAGE = SystemMessage(content=_CARD_SELECTOR_SYSTEM_PROMPT)
 
 
 class CardSelectorAgent:
     def __init__(self, llm: ChatGroq, db: CardDatabase):
         self.llm = llm
         self.db = db
-        self.prompt = ChatPromptTemplate.from_messages([
-            ("system", """You are an expert Magic: The Gathering card selector.
-            Based on the strategy and requirements, select specific cards for the deck.
-            
-            Consider:
-            1. Card synergies and interactions
-            2. Mana curve optimization
-            3. Color requirements and mana base needs
-            4. Format legality and restrictions
-            5. Budget constraints if specified
-            
-            For each card selection, provide:
-            - Quantity
-            - Role in the deck
-            - Synergy explanations
-            - Alternative options
-            
-            Output your selections in a structured format:
-            ```json
-            {
-                "main_deck": {
-                    "creatures": [{"name": string, "quantity": int, "role": string}],
-                    "spells": [{"name": string, "quantity": int, "role": string}],
-                    "other": [{"name": string, "quantity": int, "role": string}]
-                },
-                "lands": [{"name": string, "quantity": int, "role": string}],
-                "sideboard": [{"name": string, "quantity": int, "role": string}]
-            }
-            ```"""),
-            MessagesPlaceholder(variable_name="messages")
-        ])
+        self.system_message = _CARD_SELECTOR_SYSTEM_MESSAGE
     
-    def run(self, state: AgentState) -> AgentState:
+    async def arun(self, state: AgentState) -> AgentState:
         # Get strategy details from previous messages
-        strategy_details = json.loads([msg.content for msg in state.messages if isinstance(msg, AIMessage)][-1])
+        strategy_details = state.parsed_outputs.get("strategy") or next(
+            (StrategyResult.model_validate_json(msg.content).strategy_details
+             for msg in reversed(state.messages) if isinstance(msg, AIMessage)),
+            None
+        )
         
         # Search for cards based on strategy requirements
-        card_selections = {}
-        for category in ["creatures", "removal", "card_advantage"]:
-            if category in strategy_details["card_ratios"]:
-                cards = self.db.search_cards({
-                    "colors": state.requirements.colors,
-                    "format": state.requirements.format,
-                    "type": category,
-                    "text": strategy_details["main_gameplan"]
-                })
-                card_selections[category] = cards
+        card_selections = await self.db.asearch_cards_multi(
+            {
+                "colors": state.requirements.colors,
+                "format": state.requirements.format,
+                "text": strategy_details.main_gameplan
+            },
+            [category for category in ["creatures", "removal", "card_advantage"]
+             if category in strategy_details.card_ratios]
+        )
         
-        response = self.llm.invoke(self.prompt.format(
-            messages=state.messages,
-            available_cards=card_selections,
-            strategy=strategy_details
-        ))
+        response = await self.llm.ainvoke([
+            self.system_message,
+            *state.messages,
+            HumanMessage(content=dumps({
+                "available_cards": card_selections,
+                "strategy": strategy_details.model_dump(mode="json")
+            }))
+        ])
+        
+        # Parse and validate card selections in one pass
+        deck_list = DeckList.model_validate_json(response.content)
+        state.parsed_outputs["card_selector"] = deck_list
         
-        # Parse card selections and create deck structure
-        deck_list = json.loads(response.content)
+        # Fetch details for every selected card in one query
+        all_names = {card.name for category in deck_list.main_deck.values() for card in category}
+        all_names |= {card.name for card in deck_list.lands}
+        all_names |= {card.name for card in deck_list.sideboard}
+        details = await self.db.aget_cards_by_names(list(all_names))
+        # The model can misspell a card name; fall back to a full-text match, and leave out what still misses
+        for name in sorted(all_names - details.keys()):
+            match = await self._search_card(name)
+            if match is None:
+                logger.warning("Dropping selected card not found in the database: %s", name)
+            else:
+                details[name] = match
         
         # Create Deck object
         main_deck = []
-        for category in deck_list["main_deck"].values():
+        for category in deck_list.main_deck.values():
             for card in category:
+                if card.name not in details:
+                    continue
                 main_deck.append(Card(
-                    name=card["name"],
-                    quantity=card["quantity"],
-                    role=card["role"],
-                    **self._get_card_details(card["name"])
+                    name=card.name,
+                    quantity=card.quantity,
+                    role=card.role,
+                    **self._build_kwargs(details[card.name])
                 ))
         
         lands = [Card(
-            name=card["name"],
-            quantity=card["quantity"],
+            name=card.name,
+            quantity=card.quantity,
             role=CardRole.MANA_SOURCE,
-            **self._get_card_details(card["name"])
-        ) for card in deck_list["lands"]]
+            **self._build_kwargs(details[card.name])
+        ) for card in deck_list.lands if card.name in details]
         
         sideboard = [Card(
-            name=card["name"],
-            quantity=card["quantity"],
-            role=card["role"],
-            **self._get_card_details(card["name"])
-        ) for card in deck_list["sideboard"]]
+            name=card.name,
+            quantity=card.quantity,
+            role=card.role,
+            **self._build_kwargs(details[card.name])
+        ) for card in deck_list.sideboard if card.name in details]
         
         state.deck = Deck(
             main_deck=main_deck,
             lands=lands,
             sideboard=sideboard,
-            statistics=calculate_deck_statistics(Deck(
-                main_deck=main_deck,
-                lands=lands,
-                sideboard=sideboard,
-                total_cards=60
-            ))
+            statistics=calculate_deck_statistics_from_lists(main_deck, lands, sideboard)
         )
         
         state.messages.append(AIMessage(content=response.content))
         state.current_agent = "optimizer"
         return state
     
-    def _get_card_details(self, card_name: str) -> Dict[str, Any]:
-        # Get card details from database
-        card_data = self.db.search_cards({"text": card_name})[0]
+    async def _search_card(self, name: str) -> Optional[Dict[str, Any]]:
+        # Only the best match is needed, so stop the stream after the first row
+        async with aclosing(self.db.astream_cards({"text": name})) as cards:
+            async for card in cards:
+                return card
+        return None
+    
+    @staticmethod
+    def _build_kwargs(card_data: Dict[str, Any]) -> Dict[str, Any]:
+        # Map a card row from the database onto Card constructor arguments
         return {
             "mana_cost": ManaCost.from_string(card_data["mana_cost"]) if card_data["mana_cost"] else None,
             "type_line": card_data["type_line"],
@@ -1,66 +1,72 @@
-import json
+import inspect
+from collections import Counter
 from typing import Any, Dict, List
 from langchain_groq import ChatGroq
-from langchain_core.messages import AIMessage
-from langchain_core.prompts import ChatPromptTemplate,MessagesPlaceholder
-from backend.app.agents.agent_state import AgentState
-from backend.app.models.card import  Deck
-from backend.app.utils.utils import calculate_deck_statistics, validate_mana_base
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+from app.agents.agent_state import AgentState
+from app.models.card import  Deck
+from app.utils.json_codec import dumps, loads
+from app.utils.utils import calculate_deck_statistics, validate_mana_base
+
+
+_DECK_OPTIMIZER_SYSTEM_PROMPT = inspect.cleandoc("""You are a Magic: The Gathering deck optimization expert.
+    Review the current deck list and suggest improvements for:
+    
+    1. Mana curve optimization
+    2. Color consistency
+    3. Strategic coherence
+    4. Sideboard effectiveness
+    5. Common matchup preparation
+    
+    Analyze:
+    - Card quantity ratios
+    - Mana source distribution
+    - Curve considerations
+    - Sideboard coverage
+    - Potential weaknesses
+    
+    Output your analysis and suggestions in a structured format:
+    ```json
+    {
+        "analysis": {
+            "curve_issues": list[string],
+            "color_issues": list[string],
+            "strategy_issues": list[string],
+            "sideboard_issues": list[string]
+        },
+        "suggestions": {
+            "cards_to_remove": [{"name": string, "reason": string}],
+            "cards_to_add": [{"name": string, "reason": string}],
+            "quantity_adjustments": [{"name": string, "change": int, "reason": string}]
+        }
+    }
+    ```""")
+_DECK_OPTIMIZER_SYSTEM_MESSAGE = SystemMessage(content=_DECK_OPTIMIZER_SYSTEM_PROMPT)
 
 
 class DeckOptimizerAgent:
     def __init__(self, llm: ChatGroq):
         self.llm = llm
-        self.prompt = ChatPromptTemplate.from_messages([
-            ("system", """You are a Magic: The Gathering deck optimization expert.
-            Review the current deck list and suggest improvements for:
-            
-            1. Mana curve optimization
-            2. Color consistency
-            3. Strategic coherence
-            4. Sideboard effectiveness
-            5. Common matchup preparation
-            
-            Analyze:
-            - Card quantity ratios
-            - Mana source distribution
-            - Curve considerations
-            - Sideboard coverage
-            - Potential weaknesses
-            
-            Output your analysis and suggestions in a structured format:
-            ```json
-            {
-                "analysis": {
-                    "curve_issues": list[string],
-                    "color_issues": list[string],
-                    "strategy_issues": list[string],
-                    "sideboard_issues": list[string]
-                },
-                "suggestions": {
-                    "cards_to_remove": [{"name": string, "reason": string}],
-                    "cards_to_add": [{"name": string, "reason": string}],
-                    "quantity_adjustments": [{"name": string, "change": int, "reason": string}]
-                }
-            }
-            ```"""),
-            MessagesPlaceholder(variable_name="messages")
-        ])
+        self.system_message = _DECK_OPTIMIZER_SYSTEM_MESSAGE
     
-    def run(self, state: AgentState) -> AgentState:
+    async def arun(self, state: AgentState) -> AgentState:
         # Validate current deck
         deck_issues = state.deck.validate_deck()
         mana_issues = validate_mana_base(state.deck)
         
-        response = self.llm.invoke(self.prompt.format(
-            messages=state.messages,
-            current_deck=state.deck.model_dump(),
-            deck_issues=deck_issues,
-            mana_issues=mana_issues,
-            statistics=state.deck.statistics.model_dump()
-        ))
+        response = await self.llm.ainvoke([
+            self.system_message,
+            *state.messages,
+            HumanMessage(content=dumps({
+                "current_deck": state.dump("deck"),
+                "deck_issues": deck_issues,
+                "mana_issues": mana_issues,
+                "statistics": state.deck.statistics.model_dump(mode="json")
+            }))
+        ])
         
-        optimization_results = json.loads(response.content)
+        optimization_results = loads(response.content)
+        state.parsed_outputs["optimizer"] = optimization_results
         
         # Apply suggested changes if any
         if optimization_results["suggestions"]["cards_to_remove"] or \
@@ -78,16 +84,19 @@ class DeckOptimizerAgent:
     
     def _apply_optimization_suggestions(self, deck: Deck, suggestions: Dict[str, List[Dict[str, Any]]]):
         # Remove cards
-        for removal in suggestions["cards_to_remove"]:
-            deck.main_deck = [card for card in deck.main_deck if card.name != removal["name"]]
-            deck.lands = [card for card in deck.lands if card.name != removal["name"]]
+        removal_names = {removal["name"] for removal in suggestions["cards_to_remove"]}
+        if removal_names:
+            deck.main_deck = [card for card in deck.main_deck if card.name not in removal_names]
+            deck.lands = [card for card in deck.lands if card.name not in removal_names]
         
         # Add cards (assuming card details are fetched)
         # This would need to be implemented with proper card detail fetching
         
         # Adjust quantities
+        # Several adjustments may name the same card; they add up rather than the last one winning
+        adjustments = Counter()
         for adjustment in suggestions["quantity_adjustments"]:
-            for card_list in [deck.main_deck, deck.lands]:
-                for card in card_list:
-                    if card.name == adjustment["name"]:
-                        card.quantity += adjustment["change"]
\ No newline at end of file
+            adjustments[adjustment["name"]] += adjustment["change"]
+        for card in (*deck.main_deck, *deck.lands):
+            if card.name in adjustments:
+                card.quantity += adjustments[card.name]
\ No newline at end of file
@@ -1,61 +1,99 @@
 import asyncio
-import json
+import functools
+import hashlib
+from typing import Optional
 from langchain_groq import ChatGroq
-from backend.app.agents.agent_state import AgentState
-from backend.app.agents.card_selector_agent import CardSelectorAgent
-from backend.app.agents.deck_optimizer_agent import DeckOptimizerAgent
-from backend.app.agents.final_review_agent import FinalReviewerAgent
-from backend.app.agents.strategy_agent import StrategyAgent
-from backend.app.core.database import CardDatabase
-from backend.app.models.schemas import DeckRequirements
+from app.agents.agent_state import AgentState
+from app.agents.card_selector_agent import CardSelectorAgent
+from app.agents.deck_optimizer_agent import DeckOptimizerAgent
+from app.agents.final_review_agent import FinalReviewerAgent
+from app.agents.strategy_agent import StrategyAgent
+from app.core.database import DB_INSTANCE, CardDatabase
+from app.models.schemas import DeckRequirements
+from app.utils.json_codec import dumps, loads
 from langchain_core.messages import HumanMessage
+from langgraph.cache.memory import InMemoryCache
 from langgraph.graph import StateGraph, END
+from langgraph.types import CachePolicy
 
-from backend.app.core.config import settings
+from app.core.config import settings
+
+# Strategy output is deterministic (temperature 0) for a given input, so identical requests share it.
+# A cache hit replays the node's writes, messages included, so the key covers everything the node
+# reads: the requirements and the full message history (which carries any reviewer feedback).
+STRATEGY_CACHE_TTL_SECONDS = 3600
+
+def _strategy_cache_key(state: AgentState) -> str:
+    history = dumps([[message.type, message.content] for message in state.messages])
+    digest = hashlib.sha256(history.encode()).hexdigest()
+    return f"{state.iteration}:{digest}:{state.dump_json('requirements')}"
+
+def _route_review(state: AgentState) -> str:
+    return state.current_agent
 
 # Main Workflow
-def create_deck_building_graph(llm: ChatGroq, db: CardDatabase) -> StateGraph:
+def create_deck_building_graph(llm: ChatGroq, db: CardDatabase, reviewer: Optional[FinalReviewerAgent] = None) -> StateGraph:
     workflow = StateGraph(AgentState)
+    reviewer = reviewer or FinalReviewerAgent(llm, db)
     
     # Add agents
-    workflow.add_node("strategy", StrategyAgent(llm))
-    workflow.add_node("card_selector", CardSelectorAgent(llm, db))
-    workflow.add_node("optimizer", DeckOptimizerAgent(llm))
-    workflow.add_node("reviewer", FinalReviewerAgent(llm, db))
+    workflow.add_node(
+        "strategy",
+        StrategyAgent(llm, db).arun,
+        cache_policy=CachePolicy(key_func=_strategy_cache_key, ttl=STRATEGY_CACHE_TTL_SECONDS)
+    )
+    workflow.add_node("card_selector", CardSelectorAgent(llm, db).arun)
+    workflow.add_node("optimizer", DeckOptimizerAgent(llm).arun)
+    workflow.add_node("reviewer", reviewer.arun)
     
     # Define edges
+    workflow.set_entry_point("strategy")
     workflow.add_edge("strategy", "card_selector")
     workflow.add_edge("card_selector", "optimizer")
     workflow.add_edge("optimizer", "reviewer")
-    workflow.add_edge("reviewer", "strategy")
-    workflow.add_edge("reviewer", "card_selector")
-    workflow.add_edge("reviewer", END)
+    # The reviewer records its decision in current_agent; route on it rather than fanning out
+    workflow.add_conditional_edges(
+        "reviewer",
+        _route_review,
+        {"strategy": "strategy", "card_selector": "card_selector", "end": END}
+    )
     
     return workflow
 
-# Example usage with additional features
-async def build_deck(requirements: str):
+# Compiling the graph is independent of the request, so reuse it across calls
+@functools.lru_cache(maxsize=4)
+def _compiled_workflow(model_name: str):
     llm = ChatGroq(
-        model="llama-3.1-70b-versatile",
+        model=model_name,
         temperature=0,
-        streaming=True
+        streaming=False
     )
-    db = CardDatabase(settings.get_database_url)
-    
+    # Share the application's database instance rather than opening a second set of pools
+    reviewer = FinalReviewerAgent(llm, DB_INSTANCE)
+    graph = create_deck_building_graph(llm, DB_INSTANCE, reviewer).compile(cache=InMemoryCache())
+    return graph, reviewer
+
+# Example usage with additional features
+async def build_deck(requirements: str):
     # Parse requirements
-    reqs = json.loads(requirements)
+    reqs = loads(requirements)
     initial_state = AgentState(
         requirements=DeckRequirements(**reqs),
         messages=[HumanMessage(content=requirements)],
-        current_agent="strategy",
-        db=db
+        current_agent="strategy"
     )
     
-    # Create and run workflow
-    workflow = create_deck_building_graph(llm, db)
-    final_state = await workflow.arun(initial_state)
+    # Run the cached workflow
+    compiled, _ = _compiled_workflow(settings.GROQ_MODEL)
+    final_state = await compiled.ainvoke(initial_state)
     
-    return final_state.deck
+    return final_state["deck"]
+
+async def shutdown():
+    # Every request shares the cached reviewer, so its background deck saves are awaited once, at exit,
+    # rather than making one request wait on saves started by others
+    _, reviewer = _compiled_workflow(settings.GROQ_MODEL)
+    await reviewer.drain()
 
 # Example of running the system
 async def main():
@@ -71,8 +109,9 @@ async def main():
         "constraints": "Include at least 6 counterspells"
     }
     
-    deck = await build_deck(json.dumps(requirements))
-    print(json.dumps(deck.model_dump(), indent=2))
+    deck = await build_deck(dumps(requirements))
+    print(dumps(deck.model_dump(), indent=True))
+    await shutdown()
 
 if __name__ == "__main__":
     asyncio.run(main())
@@ -1,88 +1,132 @@
-import json
-from typing import Literal, Union
+import asyncio
+import functools
+import inspect
+import logging
+from typing import Any, Dict, List, Set
 from langchain_groq import ChatGroq
-from langchain_core.messages import AIMessage
-from langchain_core.prompts import ChatPromptTemplate,MessagesPlaceholder
-from backend.app.agents.agent_state import AgentState
-from backend.app.core.database import CardDatabase
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage
+from app.agents.agent_state import AgentState
+from app.core.database import CardDatabase
+from app.models.schemas import ReviewResult
 
+logger = logging.getLogger(__name__)
+
+
+_FINAL_REVIEWER_SYSTEM_PROMPT = inspect.cleandoc("""You are a Magic: The Gathering final deck reviewer.
+    Perform a comprehensive review of the deck, checking:
+    
+    1. Adherence to format rules and restrictions
+    2. Strategic coherence and game plan clarity
+    3. Mana base stability
+    4. Sideboard effectiveness
+    5. Budget constraints (if applicable)
+    
+    Provide a final assessment with:
+    - Overall deck rating (1-10)
+    - Key strengths
+    - Potential weaknesses
+    - Matchup predictions
+    - Improvement suggestions
+    
+    Output your review in a structured format:
+    ```json
+    {
+        "review": {
+            "rating": int,
+            "strengths": list[string],
+            "weaknesses": list[string],
+            "matchups": {
+                "favorable": list[string],
+                "unfavorable": list[string]
+            }
+        },
+        "decision": "APPROVE" | "REVISE_STRATEGY" | "NEEDS_OPTIMIZATION",
+        "reasons": list[string]
+    }
+    ```""")
+_FINAL_REVIEWER_SYSTEM_MESSAGE = SystemMessage(content=_FINAL_REVIEWER_SYSTEM_PROMPT)
+
+
+@functools.lru_cache(maxsize=256)
+def _review_input(deck_json: str, requirements_json: str) -> HumanMessage:
+    # Splice the pre-serialized dumps instead of re-encoding them; replayed deck states reuse the message
+    return HumanMessage(content='{"current_deck":' + deck_json + ',"requirements":' + requirements_json + '}')
 
 
 class FinalReviewerAgent:
     def __init__(self, llm: ChatGroq, db: CardDatabase):
         self.llm = llm
         self.db = db
-        self.prompt = ChatPromptTemplate.from_messages([
-            ("system", """You are a Magic: The Gathering final deck reviewer.
-            Perform a comprehensive review of the deck, checking:
-            
-            1. Adherence to format rules and restrictions
-            2. Strategic coherence and game plan clarity
-            3. Mana base stability
-            4. Sideboard effectiveness
-            5. Budget constraints (if applicable)
-            
-            Provide a final assessment with:
-            - Overall deck rating (1-10)
-            - Key strengths
-            - Potential weaknesses
-            - Matchup predictions
-            - Improvement suggestions
-            
-            Output your review in a structured format:
-            ```json
-            {
-                "review": {
-                    "rating": int,
-                    "strengths": list[string],
-                    "weaknesses": list[string],
-                    "matchups": {
-                        "favorable": list[string],
-                        "unfavorable": list[string]
-                    }
-                },
-                "decision": "APPROVE" | "REVISE_STRATEGY" | "NEEDS_OPTIMIZATION",
-                "reasons": list[string]
-            }
-            ```"""),
-            MessagesPlaceholder(variable_name="messages")
-        ])
+        self.system_message = _FINAL_REVIEWER_SYSTEM_MESSAGE
+        # In-flight deck saves; holding a reference keeps the tasks from being garbage collected
+        self._pending_saves: Set[asyncio.Task] = set()
     
-    def run(self, state: AgentState) -> Union[AgentState, Literal["end"], Literal["strategy"]]:
-        response = self.llm.invoke(self.prompt.format(
-            messages=state.messages,
-            current_deck=state.deck.model_dump(),
-            requirements=state.requirements.model_dump()
-        ))
-        
-        review_results = json.loads(response.content)
+    async def arun(self, state: AgentState) -> AgentState:
+        response = await self.llm.ainvoke(self._format_prompt(state))
+        return self._handle_response(state, response)
+    
+    async def arun_many(self, states: List[AgentState]) -> List[AgentState]:
+        # Review several decks with one batched LLM call
+        prompts = [self._format_prompt(state) for state in states]
+        responses = await self.llm.abatch(prompts, config={"max_concurrency": 8})
+        return [self._handle_response(state, response) for state, response in zip(states, responses)]
+    
+    def _format_prompt(self, state: AgentState) -> List[BaseMessage]:
+        return [
+            self.system_message,
+            *state.messages,
+            _review_input(state.dump_json("deck"), state.dump_json("requirements"))
+        ]
+    
+    def _handle_response(self, state: AgentState, response: BaseMessage) -> AgentState:
+        review_results = ReviewResult.model_validate_json(response.content)
+        state.parsed_outputs["reviewer"] = review_results
         
         # Check iteration limit
         state.iteration += 1
         if state.iteration >= state.max_iterations:
-            review_results["decision"] = "APPROVE"
-            review_results["reasons"].append("Maximum iteration limit reached")
+            review_results.decision = "APPROVE"
+            review_results.reasons.append("Maximum iteration limit reached")
         
-        if review_results["decision"] == "APPROVE":
+        if review_results.decision == "APPROVE":
             # Save deck to database with review data
             deck_data = {
                 "name": f"{state.requirements.archetype.value} {'-'.join(state.requirements.colors)}",
-                "description": json.dumps(review_results["review"]),
+                "description": review_results.review.model_dump_json(),
                 "format": state.requirements.format,
                 "archetype": state.requirements.archetype.value,
                 "colors": state.requirements.colors,
-                "cards": state.deck.model_dump(),
+                "deck_list": state.dump("deck"),
                 "performance_data": {
-                    "predicted_rating": review_results["review"]["rating"],
-                    "favorable_matchups": review_results["review"]["matchups"]["favorable"],
-                    "unfavorable_matchups": review_results["review"]["matchups"]["unfavorable"]
+                    "predicted_rating": review_results.review.rating,
+                    "favorable_matchups": review_results.review.matchups.favorable,
+                    "unfavorable_matchups": review_results.review.matchups.unfavorable
                 }
             }
-            self.db.save_deck(deck_data)
-            return "end"
-        elif review_results["decision"] == "REVISE_STRATEGY":
-            state.messages.append(AIMessage(content=json.dumps(review_results, indent=2)))
-            return "strategy"
+            self._save_deck_in_background(deck_data)
+            state.current_agent = "end"
+        elif review_results.decision == "REVISE_STRATEGY":
+            state.messages.append(AIMessage(content=response.content))
+            state.current_agent = "strategy"
         else:
-            state.messages.append(AIMessage(content=json.dumps(review_results, indent=2)))
-            return "card_selector"
\ No newline at end of file
+            state.messages.append(AIMessage(content=response.content))
+            state.current_agent = "card_selector"
+        return state
+    
+    def _save_deck_in_background(self, deck_data: Dict[str, Any]):
+        # The graph only needs the decision, so persist the approved deck off the critical path
+        task = asyncio.create_task(self.db.asave_deck(deck_data))
+        self._pending_saves.add(task)
+        task.add_done_callback(self._on_save_done)
+    
+    def _on_save_done(self, task: asyncio.Task):
+        self._pending_saves.discard(task)
+        if task.cancelled():
+            logger.warning("Saving an approved deck was cancelled before it finished")
+        elif task.exception() is not None:
+            logger.error("Failed to save approved deck", exc_info=task.exception())
+
+    async def drain(self):
+        """Waits for every in-flight deck save; call once on shutdown so approved decks are not lost."""
+        # Failures and cancellations are already logged by _on_save_done
+        await asyncio.gather(*self._pending_saves, return_exceptions=True)
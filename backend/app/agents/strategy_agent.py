@@ -1,78 +1,99 @@
-import json
-from langchain_core.messages import AIMessage
-from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
+import asyncio
+import inspect
+from typing import List
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage
 from langchain_groq import ChatGroq
 
-from backend.app.agents.agent_state import AgentState
+from app.agents.agent_state import AgentState
+from app.core.database import CardDatabase
+from app.models.schemas import StrategyResult
+from app.utils.json_codec import dumps
+
+
+# Kept byte-identical across calls and always sent first so the provider can reuse its cached prefix
+_STRATEGY_SYSTEM_PROMPT = inspect.cleandoc("""You are a Magic: The Gathering deck building strategist expert.
+    Your role is to analyze deck requirements and develop a concrete strategy.
+    
+    Focus on:
+    1. Identifying key synergies and themes
+    2. Determining optimal card ratios
+    3. Planning the mana curve
+    4. Identifying critical card categories (removal, card advantage, etc.)
+    5. Considering the current meta and potential counter-strategies
+    
+    Provide specific recommendations for:
+    - Creature count and characteristics
+    - Spell distribution (removal, card advantage, etc.)
+    - Mana base requirements
+    - Key cards that fit the strategy
+    - Sideboard strategy
+    
+    
+    Output your analysis in a structured format:
+    ```json
+    {
+        "strategy_details": {
+            "main_gameplan": string,
+            "key_synergies": list[string],
+            "card_ratios": {
+                "creatures": {"min": int, "max": int},
+                "removal": {"min": int, "max": int},
+                "card_advantage": {"min": int, "max": int},
+                ...
+            },
+            "mana_curve": {
+                "1": {"min": int, "max": int},
+                "2": {"min": int, "max": int},
+                ...
+            },
+            "key_cards": list[string],
+            "sideboard_focus": list[string]
+        }
+    }
+    ```""")
+_STRATEGY_SYSTEM_MESSAGE = SystemMessage(content=_STRATEGY_SYSTEM_PROMPT)
 
 
 class StrategyAgent:
-    def __init__(self, llm: ChatGroq):
+    def __init__(self, llm: ChatGroq, db: CardDatabase):
         self.llm = llm
-        self.prompt = ChatPromptTemplate.from_messages([
-            ("system", """You are a Magic: The Gathering deck building strategist expert.
-            Your role is to analyze deck requirements and develop a concrete strategy.
-            
-            Focus on:
-            1. Identifying key synergies and themes
-            2. Determining optimal card ratios
-            3. Planning the mana curve
-            4. Identifying critical card categories (removal, card advantage, etc.)
-            5. Considering the current meta and potential counter-strategies
-            
-            Provide specific recommendations for:
-            - Creature count and characteristics
-            - Spell distribution (removal, card advantage, etc.)
-            - Mana base requirements
-            - Key cards that fit the strategy
-            - Sideboard strategy
-            
-            
-            Output your analysis in a structured format:
-            ```json
-            {
-                "strategy_details": {
-                    "main_gameplan": string,
-                    "key_synergies": list[string],
-                    "card_ratios": {
-                        "creatures": {"min": int, "max": int},
-                        "removal": {"min": int, "max": int},
-                        "card_advantage": {"min": int, "max": int},
-                        ...
-                    },
-                    "mana_curve": {
-                        "1": {"min": int, "max": int},
-                        "2": {"min": int, "max": int},
-                        ...
-                    },
-                    "key_cards": list[string],
-                    "sideboard_focus": list[string]
-                }
-            }
-            ```"""),
-            ("user", "{input}"),
-            MessagesPlaceholder(variable_name="messages")
-        ])
+        self.db = db
+        self.system_message = _STRATEGY_SYSTEM_MESSAGE
     
-    def run(self, state: AgentState) -> AgentState:
-        # Get similar successful decks for reference
-        similar_decks = state.db.get_similar_decks(
+    async def arun(self, state: AgentState) -> AgentState:
+        response = await self.llm.ainvoke(await self._format_prompt(state))
+        return self._handle_response(state, response)
+    
+    async def arun_many(self, states: List[AgentState]) -> List[AgentState]:
+        # Develop strategies for several requests with one batched LLM call
+        prompts = await asyncio.gather(*(self._format_prompt(state) for state in states))
+        responses = await self.llm.abatch(prompts, config={"max_concurrency": 8})
+        return [self._handle_response(state, response) for state, response in zip(states, responses)]
+    
+    async def _format_prompt(self, state: AgentState) -> List[BaseMessage]:
+        # Get similar successful decks for reference; the lookup runs while the rest of the prompt is prepared
+        similar_task = asyncio.create_task(self.db.aget_similar_decks(
             state.requirements.colors,
-            state.requirements.archetype,
+            state.requirements.archetype.value,
             state.requirements.format
-        )
-        
-        response = self.llm.invoke(self.prompt.format(
-            input={
-                "requirements": state.requirements.model_dump(),
-                "similar_decks": similar_decks,
-                "current_meta": "Current Standard meta focuses on midrange value engines and fast aggro strategies"
-            },
-            messages=state.messages
         ))
+        requirements = state.dump("requirements")
+        history = list(state.messages)
         
+        return [
+            self.system_message,
+            HumanMessage(content=dumps({
+                "requirements": requirements,
+                "similar_decks": await similar_task,
+                "current_meta": "Current Standard meta focuses on midrange value engines and fast aggro strategies"
+            })),
+            *history
+        ]
+    
+    def _handle_response(self, state: AgentState, response: BaseMessage) -> AgentState:
         # Parse strategy response
-        strategy_details = json.loads(response.content)
-        state.messages.append(AIMessage(content=json.dumps(strategy_details, indent=2)))
+        strategy = StrategyResult.model_validate_json(response.content)
+        state.parsed_outputs["strategy"] = strategy.strategy_details
+        state.messages.append(AIMessage(content=strategy.model_dump_json()))
         state.current_agent = "card_selector"
         return state
@@ -0,0 +1,20 @@
+from typing import Iterable
+
+# One bit per color of mana, so color identities fit in a smallint
+COLOR_BITS = {'W': 1, 'U': 2, 'B': 4, 'R': 8, 'G': 16}
+
+
+def colors_to_mask(colors: Iterable[str]) -> int:
+    """
+    Packs a list of color codes into a WUBRG bitmask.
+
+    Args:
+        colors (Iterable[str]): Color codes such as ['U', 'B']. Unknown codes are ignored.
+
+    Returns:
+        int: The bitmask with one bit set per color.
+    """
+    mask = 0
+    for color in colors or ():
+        mask |= COLOR_BITS.get(color, 0)
+    return mask
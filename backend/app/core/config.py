@@ -1,12 +1,8 @@
-import os
-import sys
-from functools import lru_cache
+from functools import cached_property, lru_cache
 from typing import Optional
 
 from pydantic_settings import BaseSettings
 
-sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
-
 
 class Settings(BaseSettings):
     PROJECT_NAME: str = "MTGA AI Deck Builder"
@@ -27,13 +23,19 @@ class Settings(BaseSettings):
     HOST: str = "0.0.0.0"
     PORT: int = 8000
     DATABASE_URL: Optional[str] = None
+    DB_POOL_SIZE: int = 20
+    DB_MAX_OVERFLOW: int = 40
+    DB_POOL_RECYCLE: int = 1800  # Seconds before a pooled connection is replaced
+    DB_USE_EXTERNAL_POOLER: bool = False  # True when PgBouncer/Odyssey sits in front of PostgreSQL
     REDIS_URL: Optional[str] = "redis://localhost:6379"
     ANTHROPIC_API_KEY: Optional[str] = None
+    GROQ_MODEL: str = "llama-3.1-70b-versatile"
+    CARD_CACHE_TTL_SECONDS: int = 300
     SECRET_KEY: Optional[str] = None
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
 
-    @property
+    @cached_property
     def get_database_url(self) -> str:
         return f"postgresql://{self.POSTGRES_USER}:{self.POSTGRES_PASSWORD}@{self.POSTGRES_SERVER}:{self.POSTGRES_PORT}/{self.POSTGRES_DB}"
 
@@ -48,4 +50,3 @@ def get_settings() -> Settings:
     return Settings()
 
 settings = get_settings()
-print(settings.get_database_url)
\ No newline at end of file
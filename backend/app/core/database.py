@@ -1,46 +1,397 @@
-import json
-from typing import Any, Dict, List
-from sqlalchemy import create_engine, text
+import functools
+import threading
+import time
+import uuid
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Tuple
+from cachetools import TTLCache
+from sqlalchemy import bindparam, create_engine, insert, text
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
 
+from .colors import colors_to_mask
 from .config import settings
+from app.utils import json_codec
+
+# Format buckets that can contain cards legal in a given format (see cards.format_bucket)
+_FORMAT_BUCKETS = {
+    'standard': ['standard'],
+    'modern': ['standard', 'modern'],
+}
+_ALL_FORMAT_BUCKETS = ['standard', 'modern', 'other']
+
+# Search criteria -> (SQL condition, bind parameters for the criterion value)
+_SEARCH_CLAUSES = {
+    'text': (
+        "search_tsv @@ plainto_tsquery('english', :text)",
+        lambda value: {'text': value}
+    ),
+    # Subset test on the WUBRG bitmask: the card may only use the requested colors
+    'colors': (
+        "(color_identity_mask & :colors_mask) = color_identity_mask",
+        lambda value: {'colors_mask': colors_to_mask(value)}
+    ),
+    'cmc': (
+        "cmc <= :cmc",
+        lambda value: {'cmc': value}
+    ),
+    'type': (
+        "type_line ILIKE :type",
+        lambda value: {'type': f"%{value}%"}
+    ),
+    # The bucket check narrows the scan; containment lets idx_cards_legalities_gin answer the legality test
+    'format': (
+        "format_bucket = ANY(:format_buckets) AND legalities @> jsonb_build_object(CAST(:format AS text), 'legal')",
+        lambda value: {
+            'format': value.lower(),
+            'format_buckets': _FORMAT_BUCKETS.get(value.lower(), _ALL_FORMAT_BUCKETS)
+        }
+    ),
+}
+# Fixed clause order keeps the generated SQL (and its statement cache key) stable
+_SEARCH_KEYS = tuple(_SEARCH_CLAUSES)
+
+# JSONB parameters are bound natively so callers pass plain lists/dicts. format and
+# archetype are not selected: they always equal the filter values the caller passed in.
+_SIMILAR_DECKS_STMT = text("""
+    SELECT id, name, colors, deck_list, performance_data
+    FROM decks
+    WHERE format = :format
+      AND archetype = :archetype
+      AND colors <@ :colors
+    ORDER BY (performance_data->>'predicted_rating')::float DESC NULLS LAST
+    LIMIT :limit
+""").bindparams(bindparam("colors", type_=JSONB))
+
+@functools.lru_cache(maxsize=None)
+def _save_decks_statement():
+    """
+    INSERT ... RETURNING id for decks, built from the Deck model's table so its columns and
+    JSONB types cannot drift from the schema.
+    """
+    # Imported on first use: app.models.card imports Base from this module
+    from app.models.card import Deck
+    decks = Deck.__table__
+    return insert(decks).returning(decks.c.id)
+
+_UPDATE_DECK_PERFORMANCE_STMT = text("""
+    UPDATE decks
+    SET performance_data = performance_data || :performance_data,
+        updated_at = NOW()
+    WHERE id = :deck_id
+""").bindparams(bindparam("performance_data", type_=JSONB))
+
+# Every card column except the search_tsv document, which callers never need
+_CARD_COLUMNS = """
+    id, name, mana_cost, cmc, color_identity, color_identity_mask, oracle_text, type_line,
+    power, toughness, rarity, set_code, collector_number, image_uri, keywords, legalities,
+    format_bucket, price, vector_embedding, layout, card_faces, back_image_uri
+"""
+
+_SEARCH_CARDS_BASE = "SELECT " + _CARD_COLUMNS + " FROM cards WHERE 1=1"
+_SEARCH_BATCH_SIZE = 1000
+
+_SEARCH_CARDS_MULTI_BASE = """
+    SELECT """ + _CARD_COLUMNS + """, search.category AS search_category
+    FROM cards
+    JOIN unnest(CAST(:categories AS text[])) AS search(category)
+      ON cards.type_line ILIKE '%' || search.category || '%'
+    WHERE 1=1
+"""
+
+_CARDS_BY_NAMES_STMT = text("""
+    SELECT name, mana_cost, type_line, cmc, color_identity, oracle_text
+    FROM cards
+    WHERE name = ANY(:names)
+""")
+
+@functools.lru_cache(maxsize=128)
+def _search_statement(base: str, conditions: Tuple[str, ...]):
+    """Returns the (cached) statement for `base` filtered by the given SQL conditions."""
+    if not conditions:
+        return text(base)
+    return text(base + " AND " + " AND ".join(conditions))
 
 class CardDatabase:
     """Handles interactions with the card database for querying, saving, and updating deck data."""
     def __init__(self, connection_string: str):
-        self.engine = create_engine(connection_string)
+        # psycopg 3 prepares a statement server-side once a connection has run it prepare_threshold
+        # times (5 by default); prepared statements don't survive a transaction-pooling proxy.
+        # Requests never touch the sync engine (only init_db, update_deck_performance and scripts
+        # do), so it opens a connection per use instead of holding a second pool of idle backends.
+        self.engine = create_engine(
+            connection_string.replace('postgresql://', 'postgresql+psycopg://', 1),
+            connect_args={"prepare_threshold": None} if settings.DB_USE_EXTERNAL_POOLER else {},
+            poolclass=NullPool,
+            **self._serializer_options()
+        )
         self.SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=self.engine)
+        # asyncpg-backed engine for the API routes and the agents' a* methods
+        self.async_engine = create_async_engine(
+            connection_string.replace('postgresql://', 'postgresql+asyncpg://', 1),
+            connect_args=self._async_connect_args(),
+            **self._engine_options()
+        )
+        self.AsyncSessionLocal = async_sessionmaker(self.async_engine, class_=AsyncSession, expire_on_commit=False)
+        # In-memory snapshot of the cards legal in each format: {format: (loaded_at, cards)}
+        self._by_format: Dict[str, Tuple[float, List[Dict[str, Any]]]] = {}
+        # Short-lived cache of aget_similar_decks results, cleared whenever a deck is saved
+        self._similar_decks_cache: TTLCache = TTLCache(maxsize=1024, ttl=300)
+        self._similar_decks_lock = threading.Lock()
+        # Multi-category card search results by canonical query; card data only changes on repopulation
+        self._card_search_cache: TTLCache = TTLCache(maxsize=1024, ttl=settings.CARD_CACHE_TTL_SECONDS)
+        self._card_search_lock = threading.Lock()
+
+    @staticmethod
+    def _serializer_options() -> Dict[str, Any]:
+        """Returns the JSON serialization options shared by the sync and async engines."""
+        # JSON/JSONB parameters and results go through orjson rather than the stdlib json module
+        return {
+            "json_serializer": json_codec.dumps,
+            "json_deserializer": json_codec.loads
+        }
+
+    @classmethod
+    def _engine_options(cls) -> Dict[str, Any]:
+        """Returns the pooling and serialization options of the async engine."""
+        options = cls._serializer_options()
+        if settings.DB_USE_EXTERNAL_POOLER:
+            # PgBouncer/Odyssey already pools server connections; a second pool here only adds idle backends
+            options["poolclass"] = NullPool
+        else:
+            options.update(
+                pool_size=settings.DB_POOL_SIZE,
+                max_overflow=settings.DB_MAX_OVERFLOW,
+                pool_pre_ping=True,
+                pool_recycle=settings.DB_POOL_RECYCLE
+            )
+        return options
+
+    @staticmethod
+    def _async_connect_args() -> Dict[str, Any]:
+        """Returns the asyncpg connection arguments for the async engine."""
+        if not settings.DB_USE_EXTERNAL_POOLER:
+            return {}
+        # A transaction-pooling proxy hands each transaction to any server connection, so asyncpg must
+        # not cache prepared statements, and the unnamed ones it still prepares need names that cannot
+        # collide with another client's on the same server connection
+        return {
+            "statement_cache_size": 0,
+            "prepared_statement_cache_size": 0,
+            "prepared_statement_name_func": lambda: f"__asyncpg_{uuid.uuid4()}__",
+        }
+
+    @staticmethod
+    def _search_conditions(query: Dict[str, Any]) -> Tuple[List[str], Dict[str, Any]]:
+        """Builds the SQL conditions and bind parameters for a card search query."""
+        conditions, params = [], {}
+        for key in _SEARCH_KEYS:
+            if key in query:
+                condition, to_params = _SEARCH_CLAUSES[key]
+                conditions.append(condition)
+                params.update(to_params(query[key]))
+        return conditions, params
 
-    def search_cards(self, query: Dict[str, Any]) -> List[Dict[str, Any]]:
-        """Searches for cards matching given criteria (text, colors, cmc, type, format)."""
-        with self.SessionLocal() as session:
-            base_query = "SELECT * FROM cards WHERE 1=1"
-            conditions, params = [], {}
-
-            if 'text' in query:
-                conditions.append("to_tsvector('english', name || ' ' || oracle_text) @@ plainto_tsquery(:text)")
-                params['text'] = query['text']
-            if 'colors' in query:
-                conditions.append("color_identity <@ :colors")
-                params['colors'] = query['colors']
-            if 'cmc' in query:
-                conditions.append("cmc <= :cmc")
-                params['cmc'] = query['cmc']
-            if 'type' in query:
-                conditions.append("type_line ILIKE :type")
-                params['type'] = f"%{query['type']}%"
-            if 'format' in query:
-                conditions.append("legalities->>:format = 'legal'")
-                params['format'] = query['format']
-
-            if conditions:
-                base_query += " AND " + " AND ".join(conditions)
-
-            result = session.execute(text(base_query), params)
-            return [dict(row._mapping) for row in result]
-
-    def save_deck(self, deck_data: Dict[str, Any]) -> int:
+    async def _format_snapshot(self, card_format: str) -> List[Dict[str, Any]]:
+        """Returns the cards legal in `card_format`, reloading them when the snapshot is missing or stale."""
+        loaded_at, cards = self._by_format.get(card_format, (0.0, None))
+        if cards is None or time.monotonic() - loaded_at > settings.CARD_CACHE_TTL_SECONDS:
+            conditions, params = self._search_conditions({'format': card_format})
+            async with self.async_engine.connect() as conn:
+                result = await conn.execute(_search_statement(_SEARCH_CARDS_BASE, tuple(conditions)), params)
+                cards = [dict(row._mapping) for row in result]
+            self._by_format[card_format] = (time.monotonic(), cards)
+        return cards
+
+    def refresh_card_cache(self, card_format: Optional[str] = None):
+        """
+        Drops the in-memory card snapshot and cached search results so the next search reloads them.
+
+        Args:
+            card_format (Optional[str]): The format to refresh; refreshes every format when omitted.
+        """
+        if card_format is None:
+            self._by_format.clear()
+        else:
+            self._by_format.pop(card_format.lower(), None)
+        with self._card_search_lock:
+            self._card_search_cache.clear()
+
+    @staticmethod
+    def _search_snapshot(cards: List[Dict[str, Any]], query: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+        """Evaluates the colors, cmc and type criteria of a search against a format snapshot."""
+        colors_mask = colors_to_mask(query['colors']) if 'colors' in query else None
+        max_cmc = query.get('cmc')
+        type_needle = query['type'].lower() if 'type' in query else None
+
+        for card in cards:
+            card_mask = card['color_identity_mask']
+            if colors_mask is not None and (card_mask is None or card_mask & colors_mask != card_mask):
+                continue
+            if max_cmc is not None and (card['cmc'] is None or card['cmc'] > max_cmc):
+                continue
+            if type_needle is not None and type_needle not in (card['type_line'] or '').lower():
+                continue
+            yield card
+
+    async def astream_cards(self, query: Dict[str, Any]) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Searches for cards matching given criteria (text, colors, cmc, type, format).
+
+        Matches are streamed from a server-side cursor in batches of `_SEARCH_BATCH_SIZE`
+        rows; callers that stop early should close the iterator (e.g. `contextlib.aclosing`)
+        so the connection goes back to the pool promptly.
+        """
+        # Format-scoped searches without full-text criteria are answered from memory
+        if 'format' in query and 'text' not in query:
+            for card in self._search_snapshot(await self._format_snapshot(query['format'].lower()), query):
+                yield dict(card)
+            return
+
+        conditions, params = self._search_conditions(query)
+        async with self.async_engine.connect() as conn:
+            result = await conn.stream(
+                _search_statement(_SEARCH_CARDS_BASE, tuple(conditions)),
+                params,
+                execution_options={"yield_per": _SEARCH_BATCH_SIZE}
+            )
+            async for row in result.mappings():
+                yield dict(row)
+
+    async def asearch_cards_multi(self, common_filter: Dict[str, Any], categories: List[str]) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Searches for cards in several type categories with a single query.
+
+        Args:
+            common_filter (Dict[str, Any]): Criteria shared by every category (text, colors, cmc, format).
+            categories (List[str]): The type categories to match against each card's type line.
+
+        Returns:
+            Dict[str, List[Dict[str, Any]]]: The matching cards grouped by category.
+        """
+        grouped: Dict[str, List[Dict[str, Any]]] = {category: [] for category in categories}
+        if not categories:
+            return grouped
+
+        # Format-scoped searches without full-text criteria are answered from memory
+        if 'format' in common_filter and 'text' not in common_filter:
+            cards = await self._format_snapshot(common_filter['format'].lower())
+            needles = [(category, category.lower()) for category in categories]
+            snapshot_filter = {key: value for key, value in common_filter.items() if key != 'type'}
+            for card in self._search_snapshot(cards, snapshot_filter):
+                type_line = (card['type_line'] or '').lower()
+                for category, needle in needles:
+                    if needle in type_line:
+                        grouped[category].append(dict(card))
+            return grouped
+
+        cache_key = self._card_search_key(common_filter, categories)
+        cached = self._cached_card_search(cache_key)
+        if cached is not None:
+            return cached
+
+        statement, params = self._search_multi_statement(common_filter, categories)
+        async with self.async_engine.connect() as conn:
+            result = await conn.execute(statement, params)
+            for row in result:
+                card = dict(row._mapping)
+                grouped[card.pop('search_category')].append(card)
+        return self._store_card_search(cache_key, grouped)
+
+    @staticmethod
+    def _card_search_key(common_filter: Dict[str, Any], categories: List[str]) -> Tuple:
+        """Normalizes a multi-category search into a hashable key that ignores filter ordering."""
+        normalized = tuple(sorted(
+            (key, tuple(sorted(value)) if isinstance(value, (list, tuple, set)) else value)
+            for key, value in common_filter.items() if key != 'type'
+        ))
+        return normalized, tuple(categories)
+
+    def _cached_card_search(self, cache_key: Tuple) -> Optional[Dict[str, List[Dict[str, Any]]]]:
+        """Returns a copy of the cached grouped search results for `cache_key`, or None on a cache miss."""
+        with self._card_search_lock:
+            cached = self._card_search_cache.get(cache_key)
+        if cached is None:
+            return None
+        return {category: [dict(card) for card in cards] for category, cards in cached.items()}
+
+    def _store_card_search(self, cache_key: Tuple, grouped: Dict[str, List[Dict[str, Any]]]) -> Dict[str, List[Dict[str, Any]]]:
+        """Caches `grouped` under `cache_key` and returns a copy safe for the caller to mutate."""
+        with self._card_search_lock:
+            self._card_search_cache[cache_key] = grouped
+        return {category: [dict(card) for card in cards] for category, cards in grouped.items()}
+
+    def _search_multi_statement(self, common_filter: Dict[str, Any], categories: List[str]):
+        """Builds the statement and bind parameters for a multi-category search."""
+        conditions, params = self._search_conditions(
+            {key: value for key, value in common_filter.items() if key != 'type'}
+        )
+        params['categories'] = list(categories)
+        return _search_statement(_SEARCH_CARDS_MULTI_BASE, tuple(conditions)), params
+
+    async def aget_cards_by_names(self, names: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Fetches the details of every card whose name is in `names` with a single query.
+
+        Only the columns carried by the `ix_cards_name_covering` index are selected,
+        so the lookup can be served by an index-only scan.
+
+        Args:
+            names (List[str]): The card names to look up.
+
+        Returns:
+            Dict[str, Dict[str, Any]]: The matching card rows keyed by card name.
+        """
+        if not names:
+            return {}
+        async with self.async_engine.connect() as conn:
+            result = await conn.execute(_CARDS_BY_NAMES_STMT, {"names": list(names)})
+            return {row.name: dict(row._mapping) for row in result}
+
+    async def aget_similar_decks(self, colors: List[str], archetype: str, format_type: str, limit: int = 5) -> List[Dict[str, Any]]:
+        """
+        Retrieves the best-rated saved decks that share an archetype and format and stay within the given colors.
+
+        Args:
+            colors (List[str]): The color codes the decks may use.
+            archetype (str): The deck archetype to match.
+            format_type (str): The format to match.
+            limit (int): The maximum number of decks to return.
+
+        Returns:
+            List[Dict[str, Any]]: The matching decks (id, name, colors, deck_list, performance_data),
+            highest predicted rating first.
+        """
+        cache_key = (tuple(sorted(colors)), archetype, format_type, limit)
+        cached = self._cached_similar_decks(cache_key)
+        if cached is not None:
+            return cached
+
+        async with self.async_engine.connect() as conn:
+            result = await conn.execute(_SIMILAR_DECKS_STMT, {
+                "format": format_type,
+                "archetype": archetype,
+                "colors": list(colors),
+                "limit": limit
+            })
+            decks = [dict(row._mapping) for row in result]
+        return self._store_similar_decks(cache_key, decks)
+
+    def _cached_similar_decks(self, cache_key: Tuple) -> Optional[List[Dict[str, Any]]]:
+        """Returns copies of the cached decks for `cache_key`, or None on a cache miss."""
+        with self._similar_decks_lock:
+            cached = self._similar_decks_cache.get(cache_key)
+        return None if cached is None else [dict(deck) for deck in cached]
+
+    def _store_similar_decks(self, cache_key: Tuple, decks: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Caches `decks` under `cache_key` and returns copies safe for the caller to mutate."""
+        with self._similar_decks_lock:
+            self._similar_decks_cache[cache_key] = tuple(decks)
+        return [dict(deck) for deck in decks]
+
+    async def asave_deck(self, deck_data: Dict[str, Any]) -> int:
         """
         Saves a deck to the database and returns its unique ID.
 
@@ -50,20 +401,37 @@ class CardDatabase:
         Returns:
             int: The unique identifier of the saved deck.
         """
-        with self.SessionLocal() as session:
-            result = session.execute(text("""
-                INSERT INTO decks (
-                    name, description, format, archetype, colors, 
-                    cards, created_at, performance_data
-                )
-                VALUES (
-                    :name, :description, :format, :archetype, :colors,
-                    :cards, NOW(), :performance_data
-                )
-                RETURNING id
-            """), deck_data)
-            session.commit()
-            return result.scalar_one()
+        async with self.async_engine.begin() as conn:
+            result = await conn.execute(_save_decks_statement(), deck_data)
+            deck_id = result.scalar_one()
+
+        with self._similar_decks_lock:
+            self._similar_decks_cache.clear()
+        return deck_id
+
+    async def asave_decks(self, decks_data: List[Dict[str, Any]]) -> List[int]:
+        """
+        Saves several decks with one multi-row INSERT and returns their IDs.
+
+        Args:
+            decks_data (List[Dict[str, Any]]): The deck data to save, with the same keys as `asave_deck`.
+
+        Returns:
+            List[int]: The unique identifiers of the saved decks, in input order.
+        """
+        if not decks_data:
+            return []
+        # Imported on first use: app.models.card imports Base from this module
+        from app.models.card import Deck
+        async with self.async_engine.begin() as conn:
+            result = await conn.execute(
+                insert(Deck.__table__).values(decks_data).returning(Deck.__table__.c.id)
+            )
+            deck_ids = list(result.scalars())
+
+        with self._similar_decks_lock:
+            self._similar_decks_cache.clear()
+        return deck_ids
 
     def update_deck_performance(self, deck_id: int, performance_data: Dict[str, Any]):
         """
@@ -73,31 +441,26 @@ class CardDatabase:
             deck_id (int): The unique identifier of the deck to be updated.
             performance_data (Dict[str, Any]): A dictionary containing the new performance data.
         """
-        with self.SessionLocal() as session:
-            session.execute(text("""
-                UPDATE decks 
-                SET performance_data = performance_data || :performance_data::jsonb,
-                    updated_at = NOW()
-                WHERE id = :deck_id
-            """), {
+        with self.engine.begin() as conn:
+            conn.execute(_UPDATE_DECK_PERFORMANCE_STMT, {
                 "deck_id": deck_id,
-                "performance_data": json.dumps(performance_data)
+                "performance_data": performance_data
             })
-            session.commit()
 
-DB_inist = CardDatabase(settings.get_database_url)
+# The single database instance for the process; everything else shares its engines and pools
+DB_INSTANCE = CardDatabase(settings.get_database_url)
+engine = DB_INSTANCE.engine
+SessionLocal = DB_INSTANCE.SessionLocal
 Base = declarative_base()
 
-def get_db():
-    db = DB_inist.SessionLocal()
-    try:
-        yield db
-    except Exception as e:
-        db.rollback()
-        raise e
-    finally:
-        db.close()
+async def get_db():
+    async with DB_INSTANCE.AsyncSessionLocal() as db:
+        try:
+            yield db
+        except Exception as e:
+            await db.rollback()
+            raise e
 
 def init_db():
     """Initialize the database by creating all tables based on the models."""
-    Base.metadata.create_all(bind=DB_inist.engine)
+    Base.metadata.create_all(bind=DB_INSTANCE.engine)
@@ -1,16 +1,19 @@
+import argparse
 import asyncio
 import logging
 import os
 import sys
-from typing import Any, Dict, Set
-sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from typing import Any, AsyncIterator, Dict, List, Optional, Set, Tuple
+# Make backend/ importable when this file is run directly, so `app` resolves the same way as for the API
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
 
-from core.config import settings
-from models.card import Card  # Adjust import path as needed
-from services.scryfall import ScryfallService  # Import your existing service
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
-from sqlalchemy.future import select
-from sqlalchemy.orm import sessionmaker
+from app.core.colors import colors_to_mask
+from app.core.config import settings
+from app.models.card import Card
+from app.services.scryfall import ScryfallService
+from app.utils import json_codec
+import asyncpg
+from asyncpg.prepared_stmt import PreparedStatement
 
 
 # Import your existing models and database configuration
@@ -18,237 +21,400 @@ from sqlalchemy.orm import sessionmaker
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+BATCH_SIZE = 500
+# Concurrent upsert writers on the refresh path; each holds one pooled connection
+UPSERT_WORKERS = 4
+QUEUE_SIZE = 1000
+POOL_MAX_QUERIES = 50000
+
+# Columns populate writes; generated columns (format_bucket, search_tsv) are computed by PostgreSQL
+_CARD_COLUMNS = [column.name for column in Card.__table__.columns if column.computed is None]
+
+
+def _to_float(value: Any) -> float:
+    try:
+        return float(value)
+    except (ValueError, TypeError):
+        return 0.0
+
+
+def _usd_price(prices: Any) -> float:
+    usd_price = prices.get('usd') if isinstance(prices, dict) else None
+    return _to_float(usd_price) if usd_price is not None else 0.0
+
+
+# Per-column source expressions for the generated extractors. `c` is the Scryfall card,
+# `{face}` is the card itself or, for multi-faced cards, its front face `f`. Without a
+# registered codec asyncpg sends JSONB values as already-encoded text, hence `_encode`.
+_FIELD_EXPRESSIONS = {
+    'id': "_id",
+    'name': "_name",
+    'mana_cost': "{face}.get('mana_cost') or ''",
+    'cmc': "_to_float(c.get('cmc', 0))",
+    'color_identity': "_colors",
+    'color_identity_mask': "colors_to_mask(_colors)",
+    'oracle_text': "{face}.get('oracle_text') or ''",
+    'type_line': "{face}.get('type_line') or ''",
+    'power': "{face}.get('power') or ''",
+    'toughness': "{face}.get('toughness') or ''",
+    'rarity': "c.get('rarity', '')",
+    'set_code': "c.get('set', '')",
+    'collector_number': "c.get('collector_number', '')",
+    'image_uri': "{face}.get('image_uris', {{}}).get('normal') or ''",
+    'keywords': "c.get('keywords', [])",
+    'legalities': "_encode(c.get('legalities', {{}}))",
+    'price': "_usd_price(c.get('prices', {{}}))",
+    'vector_embedding': "None",
+    'layout': "c.get('layout', 'normal')",
+    'card_faces': "{card_faces}",
+    'back_image_uri': "{back_image_uri}",
+}
+
+_EXTRACTOR_TEMPLATE = """
+def {name}(c):
+    _id = c.get('id', '')
+    _name = c.get('name', 'Unknown')
+    if not _id or not _name:
+        raise ValueError(f"Card data missing required fields: {{c}}")
+{prelude}    _colors = c.get('color_identity', [])
+    return ({fields},)
+"""
+
+
+def _compile_extractor(name: str, multi_faced: bool):
+    """
+    Generates a straight-line function mapping a Scryfall card to a tuple in _CARD_COLUMNS
+    order, so the per-card work is only the lookups each column needs.
+    """
+    if multi_faced:
+        prelude = "    _faces = c['card_faces']\n    f = _faces[0]\n"
+        placeholders = {
+            'face': 'f',
+            'card_faces': '_encode(_faces)',
+            'back_image_uri': "(_faces[1].get('image_uris', {}).get('normal') or '') if len(_faces) > 1 else ''",
+        }
+    else:
+        prelude = ""
+        placeholders = {'face': 'c', 'card_faces': 'None', 'back_image_uri': "''"}
+    fields = ", ".join(_FIELD_EXPRESSIONS[column].format(**placeholders) for column in _CARD_COLUMNS)
+    namespace = {
+        '_to_float': _to_float,
+        '_usd_price': _usd_price,
+        '_encode': json_codec.dumps,
+        'colors_to_mask': colors_to_mask,
+    }
+    exec(_EXTRACTOR_TEMPLATE.format(name=name, prelude=prelude, fields=fields), namespace)
+    return namespace[name]
+
+
+_extract_single = _compile_extractor('_extract_single', multi_faced=False)
+_extract_dfc = _compile_extractor('_extract_dfc', multi_faced=True)
+
+_CARD_UPSERT_SQL = (
+    f"INSERT INTO cards ({', '.join(_CARD_COLUMNS)}) "
+    f"VALUES ({', '.join(f'${i}' for i in range(1, len(_CARD_COLUMNS) + 1))}) "
+    f"ON CONFLICT (id) DO UPDATE SET "
+    + ', '.join(f"{name} = EXCLUDED.{name}" for name in _CARD_COLUMNS if name != 'id')
+)
+
+
+class _PopulateConnection(asyncpg.Connection):
+    """Pool connection carrying the card UPSERT prepared once in _prepare_connection."""
+    card_upsert: Optional[PreparedStatement] = None
+
+
+async def _prepare_connection(conn: _PopulateConnection):
+    conn.card_upsert = await conn.prepare(_CARD_UPSERT_SQL)
+
+
+_STAGE_TABLE = 'cards_stage'
+_CREATE_STAGE_SQL = f"CREATE UNLOGGED TABLE {_STAGE_TABLE} (LIKE cards INCLUDING DEFAULTS)"
+_DROP_STAGE_SQL = f"DROP TABLE IF EXISTS {_STAGE_TABLE}"
+_MERGE_STAGE_SQL = (
+    f"INSERT INTO cards ({', '.join(_CARD_COLUMNS)}) "
+    f"SELECT DISTINCT ON (id) {', '.join(_CARD_COLUMNS)} FROM {_STAGE_TABLE} "
+    f"ON CONFLICT (id) DO UPDATE SET "
+    + ', '.join(f"{name} = EXCLUDED.{name}" for name in _CARD_COLUMNS if name != 'id')
+)
+_CARDS_EMPTY_SQL = "SELECT NOT EXISTS (SELECT 1 FROM cards)"
+# Secondary indexes on cards; indexes backing the primary key or other constraints are kept
+_SECONDARY_INDEXES_SQL = """
+    SELECT i.indexrelid::regclass::text AS name, pg_get_indexdef(i.indexrelid) AS definition,
+           quote_ident(ic.relname) AS relname, i.indisunique AS is_unique,
+           substring(pg_get_indexdef(i.indexrelid) from ' USING (.*)$') AS method_and_columns
+    FROM pg_index i
+    JOIN pg_class ic ON ic.oid = i.indexrelid
+    WHERE i.indrelid = 'cards'::regclass
+      AND NOT EXISTS (SELECT 1 FROM pg_constraint c WHERE c.conindid = i.indexrelid)
+"""
+INDEX_BUILD_MEMORY = '1GB'
+
+# Full refresh: cards is rebuilt in _REFRESH_TABLE and swapped in
+_REFRESH_TABLE = 'cards_new'
+_CREATE_REFRESH_SQL = f"CREATE UNLOGGED TABLE {_REFRESH_TABLE} (LIKE cards INCLUDING DEFAULTS INCLUDING GENERATED)"
+_DROP_REFRESH_SQL = f"DROP TABLE IF EXISTS {_REFRESH_TABLE}"
+# Cards that saved decks still reference survive a refresh even once they leave Standard
+_CARRY_OVER_SQL = (
+    f"INSERT INTO {_REFRESH_TABLE} ({', '.join(_CARD_COLUMNS)}) "
+    f"SELECT {', '.join(_CARD_COLUMNS)} FROM cards c "
+    f"WHERE EXISTS (SELECT 1 FROM deck_cards d WHERE d.card_id = c.id) "
+    f"AND NOT EXISTS (SELECT 1 FROM {_REFRESH_TABLE} n WHERE n.id = c.id)"
+)
+_TABLE_CONSTRAINTS_SQL = """
+    SELECT conname AS name, pg_get_constraintdef(oid) AS definition
+    FROM pg_constraint
+    WHERE conrelid = 'cards'::regclass AND contype <> 'n'
+"""
+_REFERENCING_KEYS_SQL = """
+    SELECT conrelid::regclass::text AS table_name, conname AS name, pg_get_constraintdef(oid) AS definition
+    FROM pg_constraint
+    WHERE confrelid = 'cards'::regclass AND contype = 'f'
+"""
+
 
 class MTGDatabasePopulator:
     def __init__(self, database_url: str):
-        # Convert the database URL to use asyncpg if needed
-        if database_url.startswith('postgresql://'):
-            database_url = database_url.replace(
-                'postgresql://', 'postgresql+asyncpg://', 1)
-
-        self.engine = create_async_engine(
-            database_url,
-            echo=True,
-            pool_pre_ping=True
-        )
-        self.async_session = sessionmaker(
-            self.engine,
-            class_=AsyncSession,
-            expire_on_commit=False
-        )
+        # asyncpg takes a plain libpq DSN, not a SQLAlchemy driver URL
+        self.dsn = database_url.replace('postgresql+asyncpg://', 'postgresql://', 1)
         self.standard_sets: Set[str] = set()
 
-    async def get_session(self) -> AsyncSession: # type: ignore
-        session = self.async_session()
-        try:
-            yield session
-            await session.commit()
-        except Exception as e:
-            await session.rollback()
-            raise e
-        finally:
-            await session.close()
+    def create_pool(self) -> asyncpg.Pool:
+        """One pooled connection per upsert worker plus one for the emptiness check and COPY."""
+        return asyncpg.create_pool(
+            self.dsn,
+            min_size=1,
+            max_size=UPSERT_WORKERS + 1,
+            max_queries=POOL_MAX_QUERIES,
+            connection_class=_PopulateConnection,
+            init=_prepare_connection,
+            # cards is rebuildable from Scryfall, so commits need not wait for the WAL flush.
+            # Passed as a startup parameter because the pool's RESET ALL on release would undo a SET.
+            server_settings={'synchronous_commit': 'off'}
+        )
 
-    def transform_card_data(self, card_data: Dict[str, Any]) -> Dict[str, Any]:
+    def transform_card_data(self, card_data: Dict[str, Any]) -> Tuple[Any, ...]:
         """
-        Transform Scryfall card data to match our database schema with safe handling of missing attributes.
-        Returns a dictionary with all required fields, using appropriate default values when data is missing.
+        Transform Scryfall card data into a parameter tuple in _CARD_COLUMNS order, using safe
+        defaults for missing attributes. Raises ValueError when the id or name is missing.
         """
-        # Initialize image URIs and card faces
-        image_uri = None
-        back_image_uri = None
-        card_faces = None
-        
-        # Safe handling of card faces and images
-        if 'card_faces' in card_data and card_data['card_faces']:
-            card_faces = card_data['card_faces']
-            front_face = card_faces[0]
-            
-            # Handle front face image
-            if 'image_uris' in front_face:
-                image_uri = front_face['image_uris'].get('normal', '')
-            
-            # Handle back face image if it exists
-            if len(card_faces) > 1 and 'image_uris' in card_faces[1]:
-                back_image_uri = card_faces[1]['image_uris'].get('normal', '')
-        else:
-            # Handle single-faced card image
-            image_uri = card_data.get('image_uris', {}).get('normal', '')
-
-        # Get data from appropriate source (front face or main card)
-        if card_faces:
-            front_face = card_faces[0]
-            mana_cost = front_face.get('mana_cost', '')
-            oracle_text = front_face.get('oracle_text', '')
-            type_line = front_face.get('type_line', '')
-            power = front_face.get('power', '')
-            toughness = front_face.get('toughness', '')
-        else:
-            mana_cost = card_data.get('mana_cost', '')
-            oracle_text = card_data.get('oracle_text', '')
-            type_line = card_data.get('type_line', '')
-            power = card_data.get('power', '')
-            toughness = card_data.get('toughness', '')
-
-        # Extract price safely
-        prices = card_data.get('prices', {})
-        usd_price = prices.get('usd')
-        try:
-            price = float(usd_price) if usd_price is not None else 0.0
-        except (ValueError, TypeError):
-            price = 0.0
+        if card_data.get('card_faces'):
+            return _extract_dfc(card_data)
+        return _extract_single(card_data)
 
-        # Extract CMC safely
+    async def flush_batch(self, conn: _PopulateConnection, batch: List[Tuple[Any, ...]]) -> int:
+        """Upsert a batch of card records in one transaction. Returns the number of cards written."""
         try:
-            cmc = float(card_data.get('cmc', 0))
-        except (ValueError, TypeError):
-            cmc = 0.0
-
-        # Build the transformed data dictionary with safe defaults
-        transformed_data = {
-            'id': card_data.get('id', ''),  # This should never be empty in practice
-            'name': card_data.get('name', 'Unknown'),  # Provide a default name
-            'mana_cost': mana_cost or '',
-            'cmc': cmc,
-            'color_identity': card_data.get('color_identity', []),
-            'type_line': type_line or '',
-            'oracle_text': oracle_text or '',
-            'power': power or '',
-            'toughness': toughness or '',
-            'rarity': card_data.get('rarity', ''),
-            'set_code': card_data.get('set', ''),
-            'collector_number': card_data.get('collector_number', ''),
-            'image_uri': image_uri or '',
-            'back_image_uri': back_image_uri or '',
-            'keywords': card_data.get('keywords', []),
-            'legalities': card_data.get('legalities', {}),
-            'price': price,
-            'vector_embedding': None,  # Keep as None for now
-            'layout': card_data.get('layout', 'normal'),
-            'card_faces': card_faces if card_faces else None
-        }
-
-        # Validate required fields
-        if not transformed_data['id'] or not transformed_data['name']:
-            raise ValueError(f"Card data missing required fields: {card_data}")
-
-        # Ensure arrays are actually arrays
-        transformed_data['color_identity'] = (
-            transformed_data['color_identity'] 
-            if isinstance(transformed_data['color_identity'], list) 
-            else []
-        )
-        transformed_data['keywords'] = (
-            transformed_data['keywords'] 
-            if isinstance(transformed_data['keywords'], list) 
-            else []
-        )
-
-        # Ensure JSON fields are dictionaries
-        transformed_data['legalities'] = (
-            transformed_data['legalities'] 
-            if isinstance(transformed_data['legalities'], dict) 
-            else {}
-        )
-
-        # Validate numeric fields
-        if not isinstance(transformed_data['cmc'], (int, float)):
-            transformed_data['cmc'] = 0.0
-        if not isinstance(transformed_data['price'], (int, float)):
-            transformed_data['price'] = 0.0
-
-        return transformed_data
-
-    async def update_card(self, session: AsyncSession, card_data: Dict[str, Any]) -> bool:
-        """Update or insert a card in the database. Returns True if successful."""
-        try:
-            transformed_data = self.transform_card_data(card_data)
-        except ValueError as e:
-            logger.error(f"Invalid card data: {e}")
-            return False
+            async with conn.transaction():
+                await conn.card_upsert.executemany(batch)
+            return len(batch)
         except Exception as e:
-            logger.error(f"Error transforming card data: {e}")
-            return False
+            logger.error("Error upserting batch of %d cards: %s", len(batch), e)
+            return 0
 
-        try:
-            stmt = select(Card).where(Card.id == transformed_data['id'])
-            result = await session.execute(stmt)
-            existing_card = result.scalar_one_or_none()
-
-            if existing_card:
-                for key, value in transformed_data.items():
-                    setattr(existing_card, key, value)
-                logger.info(f"Updated card: {existing_card.name}")
-            else:
-                new_card = Card(**transformed_data)
-                session.add(new_card)
-                logger.info(f"Added new card: {transformed_data['name']}")
-            
-            return True
+    async def _copy_records(self, cards: AsyncIterator[Dict[str, Any]], counts: Dict[str, int]):
+        async for card_data in cards:
+            try:
+                record = self.transform_card_data(card_data)
+            except Exception as e:
+                counts['failed'] += 1
+                logger.error("Error transforming card data: %s", e)
+                continue
+            counts['processed'] += 1
+            yield record
 
-        except Exception as e:
-            logger.error(
-                f"Error processing card {transformed_data.get('name', 'Unknown')}: {str(e)}")
-            return False
+    async def copy_into_empty_table(self, conn: asyncpg.Connection, scryfall: ScryfallService) -> Dict[str, int]:
+        """
+        Initial load: COPY every card into an UNLOGGED staging table over asyncpg's binary
+        protocol, then merge it into `cards` with one INSERT ... SELECT ... ON CONFLICT.
+        Secondary indexes are dropped for the merge and rebuilt once afterwards; the whole
+        load is one transaction, so a failure restores them untouched.
+        """
+        counts = {'processed': 0, 'failed': 0}
+        async with conn.transaction():
+            await conn.execute(_DROP_STAGE_SQL)
+            await conn.execute(_CREATE_STAGE_SQL)
+            await conn.copy_records_to_table(
+                _STAGE_TABLE,
+                records=self._copy_records(scryfall.get_standard_legal_cards_bulk(), counts),
+                columns=_CARD_COLUMNS
+            )
+
+            indexes = await conn.fetch(_SECONDARY_INDEXES_SQL)
+            for index in indexes:
+                await conn.execute(f"DROP INDEX {index['name']}")
+            await conn.execute(_MERGE_STAGE_SQL)
+            await conn.execute(_DROP_STAGE_SQL)
+
+            await conn.execute(f"SET LOCAL maintenance_work_mem = '{INDEX_BUILD_MEMORY}'")
+            for index in indexes:
+                await conn.execute(index['definition'])
+        return counts
 
     async def populate_database(self):
         """Populate the database with Standard-legal cards"""
         logger.info("Starting database population...")
-        async with ScryfallService() as scryfall:
+        async with ScryfallService() as scryfall, self.create_pool() as pool:
             try:
-                cards_processed = 0
-                cards_failed = 0
-                batch_size = 0
-                current_session = None
-
-                async for card_data in scryfall.get_standard_legal_cards():
-                    logger.debug(f"Retrieved card from Scryfall: {card_data['name']} (ID: {card_data['id']})")
-                    # Create new session every 100 cards
-                    if batch_size == 0:
-                        if current_session:
-                            await current_session.commit()
-                            await current_session.close()
-                        current_session = self.async_session()
-
-                    try:
-                        # Process the card as a single entity, regardless of faces
-                        success = await self.update_card(current_session, card_data)
-
-                        if success:
-                            cards_processed += 1
-                            batch_size += 1
-
-                        # Commit every 100 cards
-                        if batch_size >= 100:
-                            await current_session.commit()
-                            logger.info(f"Successfully processed {cards_processed} cards (Failed: {cards_failed})")
-                            batch_size = 0
-
-                    except Exception as e:
-                        cards_failed += 1
-                        logger.error(f"Error processing card batch: {str(e)}")
-                        await current_session.rollback()
-                        continue
-
-                # Final commit for any remaining cards
-                if current_session and batch_size > 0:
-                    await current_session.commit()
-                    await current_session.close()
+                async with pool.acquire() as conn:
+                    table_empty = await conn.fetchval(_CARDS_EMPTY_SQL)
+                    if table_empty:
+                        logger.info("Card table is empty; bulk loading with COPY")
+                        counts = await self.copy_into_empty_table(conn, scryfall)
+
+                if not table_empty:
+                    counts = await self.upsert_in_batches(pool, scryfall)
 
                 logger.info(
-                    f"Database population completed. Total cards processed: {cards_processed}, Failed: {cards_failed}")
+                    "Database population completed. Total cards processed: %d, Failed: %d",
+                    counts['processed'], counts['failed'])
 
             except Exception as e:
-                logger.error(f"Error populating database: {str(e)}")
+                logger.error("Error populating database: %s", e)
                 raise
 
+    async def populate_full_refresh(self):
+        """
+        Rebuild the card table from scratch: COPY into an UNLOGGED side table, make it LOGGED
+        and build its constraints and indexes under temporary names, then in one short
+        transaction swap it in for `cards` and re-point the foreign keys at it. Readers see
+        either the old or the new table, never a partial load.
+        """
+        logger.info("Starting full card table refresh...")
+        async with ScryfallService() as scryfall, self.create_pool() as pool, pool.acquire() as conn:
+            counts = {'processed': 0, 'failed': 0}
+            try:
+                await conn.execute(_DROP_REFRESH_SQL)
+                await conn.execute(_CREATE_REFRESH_SQL)
+                await conn.copy_records_to_table(
+                    _REFRESH_TABLE,
+                    records=self._copy_records(scryfall.get_standard_legal_cards_bulk(), counts),
+                    columns=_CARD_COLUMNS
+                )
+
+                constraints = await conn.fetch(_TABLE_CONSTRAINTS_SQL)
+                indexes = await conn.fetch(_SECONDARY_INDEXES_SQL)
+                # Build everything while cards is still serving reads and writes; the names of the
+                # old table's constraints and indexes are taken until it is dropped
+                renames = []
+                async with conn.transaction():
+                    await conn.execute(f"ALTER TABLE {_REFRESH_TABLE} SET LOGGED")
+                    await conn.execute(f"SET LOCAL maintenance_work_mem = '{INDEX_BUILD_MEMORY}'")
+                    for n, constraint in enumerate(constraints):
+                        temp_name = f"{_REFRESH_TABLE}_con_{n}"
+                        await conn.execute(
+                            f"ALTER TABLE {_REFRESH_TABLE} ADD CONSTRAINT {temp_name} {constraint['definition']}")
+                        renames.append(f"ALTER TABLE cards RENAME CONSTRAINT {temp_name} TO {constraint['name']}")
+                    for n, index in enumerate(indexes):
+                        temp_name = f"{_REFRESH_TABLE}_idx_{n}"
+                        unique = 'UNIQUE ' if index['is_unique'] else ''
+                        await conn.execute(
+                            f"CREATE {unique}INDEX {temp_name} ON {_REFRESH_TABLE} USING {index['method_and_columns']}")
+                        renames.append(f"ALTER INDEX {temp_name} RENAME TO {index['relname']}")
+
+                async with conn.transaction():
+                    # Inside the swap so a deck saved during the load cannot lose its cards
+                    await conn.execute(_CARRY_OVER_SQL)
+                    foreign_keys = await conn.fetch(_REFERENCING_KEYS_SQL)
+                    for key in foreign_keys:
+                        await conn.execute(f"ALTER TABLE {key['table_name']} DROP CONSTRAINT {key['name']}")
+                    await conn.execute("DROP TABLE cards")
+                    await conn.execute(f"ALTER TABLE {_REFRESH_TABLE} RENAME TO cards")
+                    for rename in renames:
+                        await conn.execute(rename)
+                    # NOT VALID skips the scan of the referencing table while the swap holds its locks
+                    for key in foreign_keys:
+                        await conn.execute(
+                            f"ALTER TABLE {key['table_name']} ADD CONSTRAINT {key['name']} {key['definition']} NOT VALID")
+
+                # Validation only takes a SHARE UPDATE EXCLUSIVE lock, so it runs alongside normal traffic
+                for key in foreign_keys:
+                    await conn.execute(f"ALTER TABLE {key['table_name']} VALIDATE CONSTRAINT {key['name']}")
+
+                logger.info(
+                    "Full refresh completed. Total cards processed: %d, Failed: %d",
+                    counts['processed'], counts['failed'])
+
+            except Exception as e:
+                logger.error("Error refreshing card table: %s", e)
+                await conn.execute(_DROP_REFRESH_SQL)
+                raise
+
+    async def _produce(self, scryfall: ScryfallService, queues: List[asyncio.Queue]):
+        try:
+            async for card_data in scryfall.get_standard_legal_cards_bulk():
+                # Shard by id so a card is only ever written by one worker, keeping
+                # concurrent batches on disjoint rows
+                await queues[hash(card_data.get('id')) % len(queues)].put(card_data)
+        finally:
+            # One end-of-stream sentinel per consumer
+            for queue in queues:
+                await queue.put(None)
+
+    async def _consume(self, pool: asyncpg.Pool, queue: asyncio.Queue, counts: Dict[str, int]):
+        batch: List[Tuple[Any, ...]] = []
+        async with pool.acquire() as conn:
+            while True:
+                card_data = await queue.get()
+                if card_data is None:
+                    break
+                try:
+                    batch.append(self.transform_card_data(card_data))
+                except Exception as e:
+                    counts['failed'] += 1
+                    logger.error("Error transforming card data: %s", e)
+                    continue
+
+                # Write every BATCH_SIZE cards with a single executemany
+                if len(batch) >= BATCH_SIZE:
+                    await self._write_batch(conn, batch, counts)
+                    logger.info("Successfully processed %d cards (Failed: %d)", counts['processed'], counts['failed'])
+
+            # Final flush for any remaining cards
+            if batch:
+                await self._write_batch(conn, batch, counts)
+
+    async def _write_batch(self, conn: _PopulateConnection, batch: List[Tuple[Any, ...]], counts: Dict[str, int]):
+        written = await self.flush_batch(conn, batch)
+        counts['processed'] += written
+        counts['failed'] += len(batch) - written
+        batch.clear()
+
+    async def upsert_in_batches(self, pool: asyncpg.Pool, scryfall: ScryfallService) -> Dict[str, int]:
+        """
+        Refresh an already-populated table. A producer shards Scryfall cards by id across
+        UPSERT_WORKERS bounded queues; each worker transforms and upserts BATCH_SIZE cards per
+        statement on its own connection, so network fetches overlap database writes.
+        """
+        counts = {'processed': 0, 'failed': 0}
+        queues: List[asyncio.Queue] = [
+            asyncio.Queue(maxsize=QUEUE_SIZE // UPSERT_WORKERS) for _ in range(UPSERT_WORKERS)]
+        consumers = [asyncio.create_task(self._consume(pool, queue, counts)) for queue in queues]
+        producer = asyncio.create_task(self._produce(scryfall, queues))
+        try:
+            await asyncio.gather(producer, *consumers)
+        except Exception:
+            for task in (producer, *consumers):
+                task.cancel()
+            raise
+        return counts
+
 
 async def main():
-    # Replace with your actual database URL
-    database_url = settings.get_database_url
+    parser = argparse.ArgumentParser(description="Populate the card table from Scryfall")
+    parser.add_argument('--full-refresh', action='store_true',
+                        help="rebuild the card table in a side table and swap it in")
+    args = parser.parse_args()
 
-    populator = MTGDatabasePopulator(database_url)
-    await populator.populate_database()
+    populator = MTGDatabasePopulator(settings.get_database_url)
+    if args.full_refresh:
+        await populator.populate_full_refresh()
+    else:
+        await populator.populate_database()
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    try:
+        import uvloop
+    except ImportError:  # uvloop has no Windows build
+        asyncio.run(main())
+    else:
+        uvloop.run(main())
@@ -1,17 +1,122 @@
 # backend/app/main.py
+import base64
+import binascii
+from datetime import datetime
+from typing import AsyncIterator, Optional, Tuple
+
 import uvicorn
-from app.core.database import get_db
+from app.core.colors import colors_to_mask
+from app.core.config import settings
+from app.core.database import DB_INSTANCE, get_db
 from app.models.card import Card, Deck
-from app.models.schemas import (CardCreate, CardResponse, DeckCreate, DeckResponse)
-from fastapi import Depends, FastAPI, HTTPException, status
+from app.models.schemas import (CardCreate, CardRow, DeckCreate, DeckDetail, DeckRow)
+from app.utils.json_codec import dumps, dumps_bytes, loads
+from cachetools import TTLCache
+from fastapi import Depends, FastAPI, HTTPException, Query, status
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy.orm import Session
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from sqlalchemy import bindparam, func, insert, select, tuple_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
 
 app = FastAPI(
     title="MTGA AI Deck Builder",
     description="An AI-powered deck building assistant for Magic: The Gathering Arena",
-    version="1.0.0"
+    version="1.0.0",
+    # Render every response body with orjson instead of the stdlib encoder
+    default_response_class=ORJSONResponse
+)
+
+# Statements for the hot read paths, built once so every request reuses the same compiled-cache entry
+# list_cards reads only the columns it returns, as plain rows, so no ORM instances are built
+_LIST_CARDS_STMT = select(
+    Card.id,
+    Card.name,
+    Card.mana_cost,
+    func.coalesce(Card.cmc, 0.0).label("cmc"),
+    Card.color_identity.label("colors"),
+    Card.type_line,
+    Card.oracle_text,
+    Card.power,
+    Card.toughness,
+    Card.rarity,
+    Card.set_code,
+    Card.image_uri,
 )
+_PAGE_CARDS_STMT = _LIST_CARDS_STMT.order_by(Card.id)
+_GET_CARD_STMT = _LIST_CARDS_STMT.where(Card.id == bindparam("card_id"))
+_LIST_DECKS_STMT = select(Deck).order_by(Deck.created_at.desc(), Deck.id.desc())
+_DECK_LOAD_OPTIONS = [selectinload(Deck.cards)]
+_STREAM_BATCH_SIZE = 500
+
+# Serialized card payloads by card id; cards only change when the populator runs
+_CARD_RESPONSE_CACHE: TTLCache = TTLCache(maxsize=10_000, ttl=settings.CARD_CACHE_TTL_SECONDS)
+
+def _deck_row_to_dict(deck: Deck) -> dict:
+    """Builds a list_decks item straight from the row's attributes; orjson encodes the datetimes natively."""
+    return {
+        "id": deck.id,
+        "name": deck.name,
+        "format": deck.format,
+        "archetype": deck.archetype,
+        "description": deck.description,
+        "colors": deck.colors or [],
+        "strategy_tags": deck.strategy_tags or [],
+        "mainboard": deck.mainboard or {},
+        "sideboard": deck.sideboard or {},
+        "created_at": deck.created_at,
+        "updated_at": deck.updated_at,
+    }
+
+def _deck_values(deck: DeckCreate) -> dict:
+    """Maps a DeckCreate payload onto the decks table columns."""
+    return {
+        "name": deck.name,
+        "format": deck.format,
+        "description": deck.description,
+        "colors": deck.colors,
+        "strategy_tags": deck.strategy_tags,
+        # Card quantities by name; the full card data and statistics live in deck_list
+        "mainboard": {card.name: card.quantity for card in (*deck.main_deck, *deck.lands)},
+        "sideboard": {card.name: card.quantity for card in deck.sideboard or []},
+        "deck_list": deck.model_dump(mode="json", include={"main_deck", "lands", "sideboard", "statistics"}),
+    }
+
+def _card_values(card: CardCreate) -> dict:
+    """Maps a CardCreate payload onto the cards table columns; quantity and role only exist in decks."""
+    return {
+        "id": card.id,
+        "name": card.name,
+        "mana_cost": card.mana_cost.to_string() if card.mana_cost else "",
+        "cmc": card.cmc,
+        "color_identity": card.colors,
+        "color_identity_mask": colors_to_mask(card.colors),
+        "type_line": card.type_line,
+        "oracle_text": card.oracle_text,
+        "power": card.power,
+        "toughness": card.toughness,
+        "rarity": card.rarity,
+        "set_code": card.set_code,
+        "image_uri": card.image_uri,
+    }
+
+def _encode_deck_cursor(deck: Deck) -> str:
+    """Encodes the (created_at, id) keyset position after `deck` as an opaque cursor."""
+    return base64.urlsafe_b64encode(dumps([deck.created_at.isoformat(), deck.id]).encode()).decode()
+
+def _decode_deck_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Decodes a cursor produced by `_encode_deck_cursor`, rejecting malformed values with a 400."""
+    try:
+        created_at, deck_id = loads(base64.urlsafe_b64decode(cursor.encode()))
+        return datetime.fromisoformat(created_at), int(deck_id)
+    except (binascii.Error, ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def _constraint_name(error: IntegrityError) -> Optional[str]:
+    """Returns the name of the constraint behind an IntegrityError, read from the driver's diagnostics."""
+    # asyncpg's exception (carrying constraint_name) is chained behind SQLAlchemy's DBAPI adapter
+    return getattr(error.orig.__cause__, "constraint_name", None)
 
 # Configure CORS
 app.add_middleware(
@@ -20,6 +125,8 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Browsers hide non-safelisted response headers from scripts unless they are exposed
+    expose_headers=["X-Next-Cursor"],
 )
 
 # Root endpoint
@@ -48,120 +155,200 @@ async def health_check():
 # Deck Endpoints
 # -----------------------------------------
 
-@app.post("/decks", response_model=DeckResponse, status_code=status.HTTP_201_CREATED, tags=["Decks"])
-def create_deck(deck: DeckCreate, db: Session = Depends(get_db)):
+@app.post("/decks", response_model=DeckRow, status_code=status.HTTP_201_CREATED, tags=["Decks"])
+async def create_deck(deck: DeckCreate, db: AsyncSession = Depends(get_db)):
     """
     Create a new deck with specified attributes.
     
     Args:
         deck (DeckCreate): A Pydantic model containing deck creation data.
-        db (Session): Database session dependency.
+        db (AsyncSession): Database session dependency.
     
     Returns:
-        DeckResponse: The created deck details, including all attributes.
+        DeckRow: The stored deck.
+    
+    Raises:
+        HTTPException: If a deck with the same name already exists.
     """
-    db_deck = Deck(**deck.dict())
-    db.add(db_deck)
-    db.commit()
-    db.refresh(db_deck)
-    return db_deck
+    # RETURNING hands back the stored row, so no refresh SELECT is needed after the commit
+    try:
+        db_deck = (await db.execute(insert(Deck).values(**_deck_values(deck)).returning(Deck))).scalar_one()
+        await db.commit()
+    except IntegrityError as e:
+        await db.rollback()
+        if _constraint_name(e) == "decks_name_key":
+            raise HTTPException(status_code=409, detail="A deck with this name already exists")
+        raise e
+    return _deck_row_to_dict(db_deck)
 
-@app.get("/decks/{deck_id}", response_model=DeckResponse, tags=["Decks"])
-def get_deck(deck_id: int, db: Session = Depends(get_db)):
+@app.get("/decks/{deck_id}", response_model=DeckDetail, tags=["Decks"])
+async def get_deck(deck_id: int, db: AsyncSession = Depends(get_db)):
     """
     Retrieve a deck by its ID, including additional information such as total card count
     and color distribution.
     
     Args:
         deck_id (int): The ID of the deck to retrieve.
-        db (Session): Database session dependency.
+        db (AsyncSession): Database session dependency.
     
     Returns:
-        DeckResponse: The deck details with total card count and color distribution.
+        DeckDetail: The deck details with total card count and color distribution.
     
     Raises:
         HTTPException: If the deck with the specified ID is not found.
     """
-    db_deck = db.query(Deck).filter(Deck.id == deck_id).first()
+    # Eager-load the cards used by get_color_distribution; lazy loads are unavailable on AsyncSession
+    db_deck = await db.get(Deck, deck_id, options=_DECK_LOAD_OPTIONS)
     if not db_deck:
         raise HTTPException(status_code=404, detail="Deck not found")
-    return DeckResponse(
-        **db_deck.__dict__,
-        total_card_count=db_deck.get_total_card_count(),
-        color_distribution=db_deck.get_color_distribution()
-    )
+    # Same row mapping as list_decks, plus the derived fields; orjson serializes it directly
+    payload = _deck_row_to_dict(db_deck)
+    payload["total_card_count"] = db_deck.get_total_card_count()
+    payload["color_distribution"] = db_deck.get_color_distribution()
+    return ORJSONResponse(payload)
 
-@app.get("/decks", response_model=list[DeckResponse], tags=["Decks"])
-def list_decks(db: Session = Depends(get_db)):
+@app.get("/decks", response_model=list[DeckRow], tags=["Decks"])
+async def list_decks(
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=500),
+    db: AsyncSession = Depends(get_db)
+):
     """
-    List all decks in the database.
+    List decks, newest first, one page at a time.
+    
+    Pages are keyed on (created_at, id) rather than an offset, so every page costs the
+    same regardless of depth. The cursor for the next page is returned in the
+    `X-Next-Cursor` header, which is absent on the last page.
     
     Args:
-        db (Session): Database session dependency.
+        cursor (Optional[str]): The `X-Next-Cursor` value from the previous page; omit for the first page.
+        limit (int): The maximum number of decks to return.
+        db (AsyncSession): Database session dependency.
     
     Returns:
-        list[DeckResponse]: A list of all decks.
+        list[DeckRow]: A page of decks.
     """
-    return db.query(Deck).all()
+    stmt = _LIST_DECKS_STMT
+    if cursor is not None:
+        stmt = stmt.where(tuple_(Deck.created_at, Deck.id) < tuple_(*_decode_deck_cursor(cursor)))
+    db_decks = (await db.scalars(stmt.limit(limit))).all()
+    
+    headers = {"X-Next-Cursor": _encode_deck_cursor(db_decks[-1])} if len(db_decks) == limit else None
+    return ORJSONResponse([_deck_row_to_dict(deck) for deck in db_decks], headers=headers)
 
 # -----------------------------------------
 # Card Endpoints
 # -----------------------------------------
 
-@app.post("/cards", response_model=CardResponse, status_code=status.HTTP_201_CREATED, tags=["Cards"])
-def create_card(card: CardCreate, db: Session = Depends(get_db)):
+@app.post("/cards", response_model=CardRow, status_code=status.HTTP_201_CREATED, tags=["Cards"])
+async def create_card(card: CardCreate, db: AsyncSession = Depends(get_db)):
     """
     Create a new card with specified attributes.
     
     Args:
         card (CardCreate): A Pydantic model containing card creation data.
-        db (Session): Database session dependency.
+        db (AsyncSession): Database session dependency.
     
     Returns:
-        CardResponse: The created card details, including all attributes.
+        CardRow: The stored card.
+    
+    Raises:
+        HTTPException: If a card with the same ID already exists.
     """
-    db_card = Card(**card.dict())
-    db.add(db_card)
-    db.commit()
-    db.refresh(db_card)
-    return db_card
+    # RETURNING the same projection as the read routes hands back the response row directly
+    try:
+        row = (await db.execute(
+            insert(Card).values(**_card_values(card)).returning(*_LIST_CARDS_STMT.selected_columns)
+        )).one()
+        await db.commit()
+    except IntegrityError as e:
+        await db.rollback()
+        if _constraint_name(e) == "cards_pkey":
+            raise HTTPException(status_code=409, detail="A card with this ID already exists")
+        raise e
+    return row._asdict()
 
-@app.get("/cards/{card_id}", response_model=CardResponse, tags=["Cards"])
-def get_card(card_id: str, db: Session = Depends(get_db)):
+@app.get("/cards/{card_id}", response_model=CardRow, tags=["Cards"])
+async def get_card(card_id: str, db: AsyncSession = Depends(get_db)):
     """
     Retrieve a card by its ID.
     
     Args:
         card_id (str): The unique identifier of the card to retrieve.
-        db (Session): Database session dependency.
+        db (AsyncSession): Database session dependency.
     
     Returns:
-        CardResponse: The card details.
+        CardRow: The card details.
     
     Raises:
         HTTPException: If the card with the specified ID is not found.
     """
-    db_card = db.query(Card).filter(Card.id == card_id).first()
-    if not db_card:
-        raise HTTPException(status_code=404, detail="Card not found")
-    return db_card
+    payload = _CARD_RESPONSE_CACHE.get(card_id)
+    if payload is None:
+        row = (await db.execute(_GET_CARD_STMT, {"card_id": card_id})).first()
+        if row is None:
+            raise HTTPException(status_code=404, detail="Card not found")
+        payload = row._asdict()
+        _CARD_RESPONSE_CACHE[card_id] = payload
+    return ORJSONResponse(payload)
 
-@app.get("/cards", response_model=list[CardResponse], tags=["Cards"])
-def list_cards(db: Session = Depends(get_db)):
+@app.get("/cards", response_model=list[CardRow], tags=["Cards"])
+async def list_cards(
+    cursor: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    db: AsyncSession = Depends(get_db)
+):
     """
-    List all cards in the database.
+    List cards in the database.
+    
+    Without `limit`, every card is read from a server-side cursor and streamed out as one
+    JSON array, `_STREAM_BATCH_SIZE` cards at a time, so memory use does not grow with the table.
+    
+    With `limit`, one page of cards is returned in id order. Pages are keyed on the card id
+    rather than an offset, so every page costs the same regardless of depth. The cursor for
+    the next page is returned in the `X-Next-Cursor` header, which is absent on the last page.
     
     Args:
-        db (Session): Database session dependency.
+        cursor (Optional[str]): The `X-Next-Cursor` value from the previous page; omit for the first page.
+        limit (Optional[int]): The page size; omit to stream every card.
+        db (AsyncSession): Database session dependency.
     
     Returns:
-        list[CardResponse]: A list of all cards.
+        list[CardRow]: All cards, or a page of cards.
+    
+    Raises:
+        HTTPException: If `cursor` is given without `limit`.
     """
-    return db.query(Card).all()
+    if limit is None:
+        if cursor is not None:
+            # Streaming always starts from the first card, so a cursor there would be silently ignored
+            raise HTTPException(status_code=422, detail="cursor requires limit")
+        return StreamingResponse(_stream_cards(), media_type="application/json")
+
+    stmt = _PAGE_CARDS_STMT
+    if cursor is not None:
+        stmt = stmt.where(Card.id > cursor)
+    rows = (await db.execute(stmt.limit(limit))).all()
+
+    headers = {"X-Next-Cursor": rows[-1].id} if len(rows) == limit else None
+    return ORJSONResponse([row._asdict() for row in rows], headers=headers)
+
+async def _stream_cards() -> AsyncIterator[bytes]:
+    # The stream outlives the request's dependencies, so it owns its session
+    async with DB_INSTANCE.AsyncSessionLocal() as session:
+        result = await session.stream(_LIST_CARDS_STMT, execution_options={"yield_per": _STREAM_BATCH_SIZE})
+        separator = b"["
+        async for rows in result.partitions():
+            # One orjson call per batch; strip its brackets so the batches join into a single array
+            yield separator + dumps_bytes([row._asdict() for row in rows])[1:-1]
+            separator = b","
+        yield b"[]" if separator == b"[" else b"]"
 
 # -----------------------------------------
 # Run the app
 # -----------------------------------------
 
 if __name__ == "__main__":
-    uvicorn.run("app.main:app", host="0.0.0.0", port=8000, reload=True)
+    # "auto" selects uvloop and httptools (from uvicorn[standard]) wherever they are available
+    uvicorn.run("app.main:app", host="0.0.0.0", port=8000, reload=True,
+                loop="auto", http="auto", access_log=settings.DEBUG)
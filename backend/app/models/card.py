@@ -1,11 +1,11 @@
 from collections import Counter
 from typing import Dict, List
 
-from core.database import Base
-from sqlalchemy import (ARRAY, JSON, Column, DateTime, Float, ForeignKey, Index, Integer,
-                        String, Table, func, text)
-from sqlalchemy.orm import relationship
-from sqlalchemy.dialects.postgresql import JSONB
+from app.core.database import Base
+from sqlalchemy import (ARRAY, Column, Computed, DateTime, Float, ForeignKey, Index, Integer,
+                        SmallInteger, String, Table, func, text)
+from sqlalchemy.orm import deferred, relationship
+from sqlalchemy.dialects.postgresql import JSONB, TSVECTOR
 
 # Association table for deck-card relationship
 deck_cards = Table(
@@ -26,6 +26,7 @@ class Card(Base):
         mana_cost (str): The mana cost of the card.
         cmc (float): The converted mana cost of the card.
         color_identity (List[str]): The colors associated with the card.
+        color_identity_mask (int): The card's color identity packed as a WUBRG bitmask.
         oracle_text (str): The card's oracle text.
         type_line (str): The card's type line.
         power (str): The power value of the card (for creatures).
@@ -36,6 +37,7 @@ class Card(Base):
         image_uri (str): The URI for the card's image.
         keywords (List[str]): Any keywords associated with the card.
         legalities (Dict[str, str]): The legality status of the card in different formats.
+        format_bucket (str): The narrowest format the card is legal in ('standard', 'modern' or 'other').
         price (float): The price of the card.
         vector_embedding (Dict[str, float]): The vector embedding for the card.
         decks (List[Deck]): The decks the card is associated with.
@@ -46,7 +48,8 @@ class Card(Base):
     name = Column(String, nullable=False)
     mana_cost = Column(String)
     cmc = Column(Float)
-    color_identity = Column(ARRAY(String))
+    color_identity = Column(ARRAY(String), nullable=False, server_default='{}')
+    color_identity_mask = Column(SmallInteger)  # W=1, U=2, B=4, R=8, G=16
     oracle_text = Column(String)
     type_line = Column(String)
     power = Column(String)
@@ -55,24 +58,39 @@ class Card(Base):
     set_code = Column(String)
     collector_number = Column(String)
     image_uri = Column(String)
-    keywords = Column(ARRAY(String))
-    legalities = Column(JSON)
+    keywords = Column(ARRAY(String), nullable=False, server_default='{}')
+    legalities = Column(JSONB, nullable=False, server_default=text("'{}'::jsonb"))
+    format_bucket = Column(String, Computed(
+        "CASE WHEN legalities->>'standard' = 'legal' THEN 'standard' "
+        "WHEN legalities->>'modern' = 'legal' THEN 'modern' ELSE 'other' END",
+        persisted=True
+    ))
     price = Column(Float)
-    vector_embedding = Column(JSON)
+    vector_embedding = Column(JSONB)
+    # Full-text document for card searches; deferred so ORM reads don't load it
+    search_tsv = deferred(Column(TSVECTOR, Computed(
+        "to_tsvector('english', coalesce(name, '') || ' ' || coalesce(oracle_text, ''))",
+        persisted=True
+    )))
     
     # New fields for handling double-faced cards
     layout = Column(String)  # 'normal', 'transform', 'modal_dfc', etc.
-    card_faces = Column(JSON)  # Store full face data as JSON
+    card_faces = Column(JSONB)  # Store full face data as JSONB
     back_image_uri = Column(String)  # Store back face image separately for convenience
 
     decks = relationship("Deck", secondary=deck_cards, back_populates="cards")
     
     __table_args__ = (
-        Index('idx_cards_text_search', 
-              text("to_tsvector('english', name || ' ' || COALESCE(oracle_text, ''))")),
+        Index('idx_cards_search_tsv', search_tsv, postgresql_using='gin'),
         Index('idx_cards_color_identity', color_identity, postgresql_using='gin'),
+        Index('cards_cim_idx', color_identity_mask),
         Index('idx_cards_cmc', cmc),
+        Index('idx_cards_format_bucket', format_bucket),
+        Index('idx_cards_legalities_gin', legalities, postgresql_using='gin',
+              postgresql_ops={'legalities': 'jsonb_path_ops'}),
         Index('idx_cards_type_line', type_line),
+        Index('idx_cards_type_line_trgm', type_line, postgresql_using='gin',
+              postgresql_ops={'type_line': 'gin_trgm_ops'}),
     )
 
 class Deck(Base):
@@ -91,6 +109,9 @@ class Deck(Base):
         sideboard (Dict[str, int]): The cards in the sideboard, stored as {card_id: quantity}.
         colors (List[str]): The colors represented in the deck.
         strategy_tags (List[str]): Any strategy tags associated with the deck.
+        archetype (str): The archetype the deck was built for.
+        deck_list (Dict[str, Any]): The full deck list the agents produced, as JSON.
+        performance_data (Dict[str, Any]): Review results such as the predicted rating and matchups.
     """
     __tablename__ = "decks"
 
@@ -106,10 +127,14 @@ class Deck(Base):
     sideboard = Column(JSONB)  # Store as {card_id: quantity}
     colors = Column(JSONB)
     strategy_tags = Column(JSONB)
+    archetype = Column(String)
+    deck_list = Column(JSONB)
+    performance_data = Column(JSONB)
 
     __table_args__ = (
         Index('idx_decks_colors', colors, postgresql_using='gin'),
         Index('idx_decks_format', format),
+        Index('idx_decks_created_id', created_at.desc(), id.desc()),
     )
 
     def add_card_to_mainboard(self, card_id: str, quantity: int):
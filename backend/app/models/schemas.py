@@ -1,8 +1,8 @@
 from collections import Counter
 from datetime import datetime
-from typing import Dict, List, Optional
+from typing import Dict, List, Literal, Optional
 
-from pydantic import BaseModel, Field, validator
+from pydantic import BaseModel, ConfigDict, Field, validator
 from enum import Enum
 
 
@@ -62,6 +62,16 @@ class ManaCost(BaseModel):
         total = sum(colored.values()) + generic
         return cls(total=total, colored=colored, generic=generic)
 
+    def to_string(self) -> str:
+        """
+        Formats the mana cost in Scryfall notation, e.g. "{2}{B}{B}".
+
+        Returns:
+            str: The mana cost string, empty for a cost of nothing.
+        """
+        generic = f"{{{self.generic}}}" if self.generic else ""
+        return generic + "".join(f"{{{color}}}" * count for color, count in self.colored.items())
+
 
 class CardBase(BaseModel):
     """Represents a basic card model used in a deck."""
@@ -79,8 +89,7 @@ class CardBase(BaseModel):
     set_code: str
     image_uri: Optional[str]
 
-    class Config:
-        use_enum_values = True
+    model_config = ConfigDict(use_enum_values=True)
 
 class DeckStatistics(BaseModel):
     """Holds statistics for a deck, including color distribution and mana curve."""
@@ -115,6 +124,62 @@ class DeckRequirements(BaseModel):
         return v
 
 
+class CardEntry(BaseModel):
+    """A single card pick from the card selector's LLM output."""
+    name: str
+    quantity: int
+    role: str
+
+
+class DeckList(BaseModel):
+    """Mirrors the JSON deck list produced by the card selector agent."""
+    main_deck: Dict[str, List[CardEntry]]
+    lands: List[CardEntry]
+    sideboard: List[CardEntry]
+
+
+class CountRange(BaseModel):
+    """A minimum/maximum count recommended by the strategy agent."""
+    min: int
+    max: int
+
+
+class StrategyDetails(BaseModel):
+    """The concrete deck building strategy produced by the strategy agent."""
+    main_gameplan: str
+    key_synergies: List[str] = Field(default_factory=list)
+    card_ratios: Dict[str, CountRange] = Field(default_factory=dict)
+    mana_curve: Dict[str, CountRange] = Field(default_factory=dict)
+    key_cards: List[str] = Field(default_factory=list)
+    sideboard_focus: List[str] = Field(default_factory=list)
+
+
+class StrategyResult(BaseModel):
+    """Mirrors the JSON output of the strategy agent."""
+    strategy_details: StrategyDetails
+
+
+class Matchups(BaseModel):
+    """Predicted favorable and unfavorable matchups for a deck."""
+    favorable: List[str] = Field(default_factory=list)
+    unfavorable: List[str] = Field(default_factory=list)
+
+
+class DeckReview(BaseModel):
+    """The final reviewer's assessment of a deck."""
+    rating: int
+    strengths: List[str] = Field(default_factory=list)
+    weaknesses: List[str] = Field(default_factory=list)
+    matchups: Matchups = Field(default_factory=Matchups)
+
+
+class ReviewResult(BaseModel):
+    """Mirrors the JSON output of the final reviewer agent."""
+    review: DeckReview
+    decision: Literal["APPROVE", "REVISE_STRATEGY", "NEEDS_OPTIMIZATION"]
+    reasons: List[str] = Field(default_factory=list)
+
+
 class CardCreate(CardBase):
     """Schema for creating a card, including a unique identifier."""
     id: str
@@ -124,8 +189,24 @@ class CardResponse(CardBase):
     """Response schema for card information, used for API responses."""
     id: str
 
-    class Config:
-        orm_mode = True
+    # Validated straight from ORM rows, with no intermediate mapping step
+    model_config = ConfigDict(from_attributes=True)
+
+
+class CardRow(BaseModel):
+    """A stored card as the card routes return it, one field per selected column."""
+    id: str
+    name: str
+    mana_cost: Optional[str]
+    cmc: float
+    colors: List[str]
+    type_line: Optional[str]
+    oracle_text: Optional[str]
+    power: Optional[str]
+    toughness: Optional[str]
+    rarity: Optional[str]
+    set_code: Optional[str]
+    image_uri: Optional[str]
 
 
 class DeckBase(BaseModel):
@@ -163,6 +244,10 @@ class DeckBase(BaseModel):
         return issues
 
 
+class DeckCreate(DeckBase):
+    """Schema for creating a deck."""
+
+
 class DeckResponse(DeckBase):
     id: int
     created_at: datetime
@@ -171,5 +256,25 @@ class DeckResponse(DeckBase):
     # New field for color distribution
     color_distribution: Optional[Dict[str, int]]
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
+
+
+class DeckRow(BaseModel):
+    """A stored deck as the deck routes return it, mirroring the decks table columns."""
+    id: int
+    name: str
+    format: str
+    archetype: Optional[str]
+    description: Optional[str]
+    colors: List[str]
+    strategy_tags: List[str]
+    mainboard: Dict[str, int]
+    sideboard: Dict[str, int]
+    created_at: datetime
+    updated_at: Optional[datetime]
+
+
+class DeckDetail(DeckRow):
+    """A stored deck with the card count and color distribution derived from its cards."""
+    total_card_count: int
+    color_distribution: Dict[str, int]
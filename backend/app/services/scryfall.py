@@ -4,6 +4,8 @@ import time
 from typing import Any, AsyncGenerator, Dict, Optional
 
 import aiohttp
+import ijson
+from app.utils import json_codec
 
 
 class ScryfallAPIError(Exception):
@@ -39,6 +41,8 @@ class ScryfallService:
     """
 
     BASE_URL = "https://api.scryfall.com"
+    # Bulk files are hundreds of MB; only bound the gap between reads, not the whole download
+    BULK_DOWNLOAD_TIMEOUT = aiohttp.ClientTimeout(total=None, sock_read=60)
 
     def __init__(self, session: Optional[aiohttp.ClientSession] = None):
         self.session = session
@@ -75,7 +79,7 @@ class ScryfallService:
 
         try:
             async with self.session.request(method, url, **kwargs) as response:
-                data = await response.json()
+                data = await response.json(loads=json_codec.loads)
 
                 if response.status == 429:  # Too Many Requests
                     retry_after = int(response.headers.get('Retry-After', 1))
@@ -189,3 +193,46 @@ class ScryfallService:
             except Exception as e:
                 self.logger.error(f"Error fetching Standard cards: {str(e)}")
                 raise
+
+    async def get_bulk_cards(self, bulk_type: str = "oracle_cards") -> AsyncGenerator[Dict[str, Any], None]:
+        """
+        Stream every card in one of Scryfall's nightly bulk-data files.
+        The file is downloaded once and parsed incrementally, so it is never held in memory.
+
+        Args:
+            bulk_type: The bulk-data type, e.g. "oracle_cards" or "default_cards"
+
+        Yields:
+            Dict[str, Any]: Card data for each card in the file
+        """
+        catalog = await self._make_request("bulk-data")
+        download_uri = next(
+            (entry["download_uri"] for entry in catalog.get("data", []) if entry.get("type") == bulk_type),
+            None
+        )
+        if download_uri is None:
+            raise ScryfallAPIError(f"Unknown bulk data type: {bulk_type}")
+
+        await self.rate_limiter.acquire()
+        try:
+            async with self.session.get(download_uri, timeout=self.BULK_DOWNLOAD_TIMEOUT) as response:
+                if not response.ok:
+                    raise ScryfallAPIError(f"Bulk data download failed: {download_uri}", response.status)
+                async for card in ijson.items_async(response.content, "item", use_float=True):
+                    yield card
+
+        except aiohttp.ClientError as e:
+            self.logger.error(f"Network error occurred: {str(e)}")
+            raise ScryfallAPIError(f"Network error: {str(e)}")
+
+    async def get_standard_legal_cards_bulk(self) -> AsyncGenerator[Dict[str, Any], None]:
+        """
+        Get all Standard-legal cards from the oracle-cards bulk file in a single download,
+        matching the one-printing-per-card results of get_standard_legal_cards.
+
+        Yields:
+            Dict[str, Any]: Card data for each Standard-legal card
+        """
+        async for card in self.get_bulk_cards("oracle_cards"):
+            if card.get("legalities", {}).get("standard") == "legal":
+                yield card
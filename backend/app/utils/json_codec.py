@@ -0,0 +1,43 @@
+from typing import Any
+
+import orjson
+
+
+def loads(data: Any) -> Any:
+    """
+    Parses a JSON document using orjson.
+
+    Args:
+        data (Any): The JSON document as str, bytes, bytearray or memoryview.
+
+    Returns:
+        Any: The parsed Python object.
+    """
+    return orjson.loads(data)
+
+
+def dumps(obj: Any, indent: bool = False) -> str:
+    """
+    Serializes an object to a JSON string using orjson.
+
+    Args:
+        obj (Any): The object to serialize.
+        indent (bool): If True, pretty-print the output with two-space indentation.
+
+    Returns:
+        str: The JSON document. orjson produces bytes, so the result is decoded for APIs expecting str.
+    """
+    return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if indent else None).decode()
+
+
+def dumps_bytes(obj: Any) -> bytes:
+    """
+    Serializes an object to JSON bytes using orjson, for callers writing straight to a byte stream.
+
+    Args:
+        obj (Any): The object to serialize.
+
+    Returns:
+        bytes: The JSON document as UTF-8 bytes.
+    """
+    return orjson.dumps(obj)
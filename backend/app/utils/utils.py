@@ -1,6 +1,6 @@
 from collections import Counter
-from typing import List
-from backend.app.models.schemas import DeckBase, DeckStatistics
+from typing import List, Optional
+from app.models.schemas import CardBase, DeckBase, DeckStatistics
 
 
 def calculate_deck_statistics(deck: DeckBase) -> DeckStatistics:
@@ -13,11 +13,29 @@ def calculate_deck_statistics(deck: DeckBase) -> DeckStatistics:
     Returns:
         DeckStatistics: A DeckStatistics object containing the calculated statistics.
     """
-    all_cards = deck.main_deck + deck.lands
+    return calculate_deck_statistics_from_lists(deck.main_deck, deck.lands, deck.sideboard)
+
+def calculate_deck_statistics_from_lists(
+    main_deck: List[CardBase],
+    lands: List[CardBase],
+    sideboard: Optional[List[CardBase]] = None
+) -> DeckStatistics:
+    """
+    Calculates deck statistics from raw card lists, without building a validated deck first.
+
+    Args:
+        main_deck (List[CardBase]): The non-land cards of the deck.
+        lands (List[CardBase]): The land cards of the deck.
+        sideboard (Optional[List[CardBase]]): The sideboard cards; not counted in the statistics.
+
+    Returns:
+        DeckStatistics: A DeckStatistics object containing the calculated statistics.
+    """
+    all_cards = main_deck + lands
     total_cards = len(all_cards)
 
     # Calculate average CMC (excluding lands)
-    non_land_cards = [card for card in deck.main_deck if 'Land' not in card.type_line]
+    non_land_cards = [card for card in main_deck if 'Land' not in card.type_line]
     avg_cmc = sum(card.cmc * card.quantity for card in non_land_cards) / sum(card.quantity for card in non_land_cards)
 
     # Distributions and curve calculations
@@ -32,7 +50,7 @@ def calculate_deck_statistics(deck: DeckBase) -> DeckStatistics:
             curve[int(card.mana_cost.total)] += card.quantity
 
     # Land distribution by color
-    mana_sources.update(deck.lands)
+    mana_sources.update(lands)
 
     return DeckStatistics(
         average_cmc=avg_cmc,
@@ -3,14 +3,11 @@
 import os
 import sys
 sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
-from app.core.config import settings
-from sqlalchemy import create_engine, text
+from app.core.database import engine
+from sqlalchemy import text
 
 def test_connection():
-    # Create an engine instance using the database URL
-    engine = create_engine(settings.get_database_url)
-
-    # Connect to the database
+    # Connect to the database through the application's shared engine
     with engine.connect() as connection:
         # Use the text() function to make "SELECT 1" executable
         result = connection.execute(text("SELECT 1"))  # Test query
@@ -0,0 +1,157 @@
+# populate_extractors_test.py
+
+import os
+import sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import pytest
+
+pytest.importorskip("asyncpg")
+pytest.importorskip("sqlalchemy")
+
+from app.core.populate import _CARD_COLUMNS, MTGDatabasePopulator
+from app.utils import json_codec
+
+# The generated extractors must produce exactly what the dict-based transform_card_data did,
+# column for column; JSONB values are the encoded text asyncpg is sent
+LEGALITIES = {"standard": "legal", "modern": "legal"}
+
+SINGLE_FACED = {
+    "id": "single-1",
+    "name": "Sheoldred, the Apocalypse",
+    "mana_cost": "{2}{B}{B}",
+    "cmc": 4.0,
+    "color_identity": ["B"],
+    "type_line": "Legendary Creature — Phyrexian Praetor",
+    "oracle_text": "Deathtouch",
+    "power": "4",
+    "toughness": "5",
+    "rarity": "mythic",
+    "set": "dmu",
+    "collector_number": "107",
+    "image_uris": {"normal": "https://img.example/sheoldred.jpg"},
+    "keywords": ["Deathtouch"],
+    "legalities": LEGALITIES,
+    "prices": {"usd": "72.50"},
+    "layout": "normal",
+}
+
+FACES = [
+    {
+        "name": "Fable of the Mirror-Breaker",
+        "mana_cost": "{2}{R}",
+        "type_line": "Enchantment — Saga",
+        "oracle_text": "Create a 2/2 Goblin Shaman.",
+        "image_uris": {"normal": "https://img.example/fable-front.jpg"},
+    },
+    {
+        "name": "Reflection of Kiki-Jiki",
+        "mana_cost": "",
+        "type_line": "Enchantment Creature — Goblin Shaman",
+        "oracle_text": "Copy target creature.",
+        "power": "2",
+        "toughness": "2",
+        "image_uris": {"normal": "https://img.example/fable-back.jpg"},
+    },
+]
+
+DOUBLE_FACED = {
+    "id": "dfc-1",
+    "name": "Fable of the Mirror-Breaker // Reflection of Kiki-Jiki",
+    "cmc": 3.0,
+    "color_identity": ["R"],
+    "rarity": "rare",
+    "set": "neo",
+    "collector_number": "141",
+    "card_faces": FACES,
+    "keywords": [],
+    "legalities": LEGALITIES,
+    "prices": {"usd": "18.00"},
+    "layout": "transform",
+}
+
+NULL_PRICES = {
+    "id": "null-price-1",
+    "name": "Island",
+    "cmc": 0,
+    "color_identity": ["U"],
+    "type_line": "Basic Land — Island",
+    "rarity": "common",
+    "set": "dmu",
+    "collector_number": "265",
+    "legalities": LEGALITIES,
+    "prices": {"usd": None, "usd_foil": None},
+    "layout": "normal",
+}
+
+
+def _record(card_data):
+    return dict(zip(_CARD_COLUMNS, MTGDatabasePopulator("postgresql://").transform_card_data(card_data)))
+
+
+def test_single_faced_card():
+    assert _record(SINGLE_FACED) == {
+        "id": "single-1",
+        "name": "Sheoldred, the Apocalypse",
+        "mana_cost": "{2}{B}{B}",
+        "cmc": 4.0,
+        "color_identity": ["B"],
+        "color_identity_mask": 4,
+        "oracle_text": "Deathtouch",
+        "type_line": "Legendary Creature — Phyrexian Praetor",
+        "power": "4",
+        "toughness": "5",
+        "rarity": "mythic",
+        "set_code": "dmu",
+        "collector_number": "107",
+        "image_uri": "https://img.example/sheoldred.jpg",
+        "keywords": ["Deathtouch"],
+        "legalities": json_codec.dumps(LEGALITIES),
+        "price": 72.5,
+        "vector_embedding": None,
+        "layout": "normal",
+        "card_faces": None,
+        "back_image_uri": "",
+    }
+
+
+def test_double_faced_card_reads_the_front_face():
+    assert _record(DOUBLE_FACED) == {
+        "id": "dfc-1",
+        "name": "Fable of the Mirror-Breaker // Reflection of Kiki-Jiki",
+        "mana_cost": "{2}{R}",
+        "cmc": 3.0,
+        "color_identity": ["R"],
+        "color_identity_mask": 8,
+        "oracle_text": "Create a 2/2 Goblin Shaman.",
+        "type_line": "Enchantment — Saga",
+        "power": "",
+        "toughness": "",
+        "rarity": "rare",
+        "set_code": "neo",
+        "collector_number": "141",
+        "image_uri": "https://img.example/fable-front.jpg",
+        "keywords": [],
+        "legalities": json_codec.dumps(LEGALITIES),
+        "price": 18.0,
+        "vector_embedding": None,
+        "layout": "transform",
+        "card_faces": json_codec.dumps(FACES),
+        "back_image_uri": "https://img.example/fable-back.jpg",
+    }
+
+
+def test_null_prices_default_to_zero():
+    record = _record(NULL_PRICES)
+    assert record["price"] == 0.0
+    assert record["cmc"] == 0.0
+    assert record["mana_cost"] == ""
+    assert record["oracle_text"] == ""
+    assert record["image_uri"] == ""
+    assert record["keywords"] == []
+    # A card whose whole prices object is null is stored the same way
+    assert _record({**NULL_PRICES, "prices": None})["price"] == 0.0
+
+
+def test_missing_id_is_rejected():
+    with pytest.raises(ValueError):
+        _record({**SINGLE_FACED, "id": ""})